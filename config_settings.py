@@ -5,6 +5,7 @@ DATA_DIR = os.path.join(BASE_DIR, 'data')
 RAW_DATA_DIR = os.path.join(DATA_DIR, 'raw')
 PROCESSED_DATA_DIR = os.path.join(DATA_DIR, 'processed')
 MODELS_DIR = os.path.join(DATA_DIR, 'models')
+CACHE_DIR = os.path.join(DATA_DIR, 'cache')
 RESULTS_DIR = os.path.join(BASE_DIR, 'results')
 
 RANDOM_STATE = 42
@@ -19,6 +20,21 @@ DEFAULT_FEATURES = [
     'stress_level', 'physical_activity', 'humidity', 'air_conditioner_use'
 ]
 
+FEATURE_DTYPES = {
+    'age': 'float32',
+    'gender': 'category',
+    'screen_time': 'float32',
+    'blink_frequency': 'float32',
+    'sleep_quality': 'float32',
+    'stress_level': 'float32',
+    'physical_activity': 'float32',
+    'humidity': 'float32',
+    'air_conditioner_use': 'category'
+}
+
+CHUNK_SIZE = 100000
+MODEL_FORMAT = 'ubj'
+
 SEVERITY_LEVELS = {
     0: 'No Risk',
     1: 'Mild',
@@ -42,4 +42,7 @@ FACTOR_WEIGHTS = {
     'stress_level': 0.58,
     'humidity': 0.47,
     'air_conditioner_use': 0.42
-}
\ No newline at end of file
+}
+
+AGE_GROUP_BINS = [25, 40]
+AGE_GROUP_LABELS = ['young', 'middle', 'senior']
\ No newline at end of file
@@ -0,0 +1,107 @@
+import xgboost as xgb
+import numpy as np
+import queue
+import time
+import os
+from concurrent.futures import ThreadPoolExecutor
+from sklearn.model_selection import StratifiedKFold
+from sklearn.metrics import accuracy_score, roc_auc_score
+from src.modeling.xgboost_predictor import native_params
+from config.model_config import CV_ENGINE_PARAMS
+from config.settings import RANDOM_STATE, CV_FOLDS
+
+class CrossValidationEngine:
+    def __init__(self, params, n_folds=CV_FOLDS, max_bin=None, n_jobs=None, fold_jobs=None):
+        self.params = params
+        self.n_folds = n_folds
+        self.max_bin = max_bin or CV_ENGINE_PARAMS['max_bin']
+        n_jobs = n_jobs or CV_ENGINE_PARAMS['n_jobs']
+        self.n_jobs = (os.cpu_count() or 1) if n_jobs == -1 else n_jobs
+        self.fold_jobs = fold_jobs or CV_ENGINE_PARAMS['fold_jobs'] or min(n_folds, self.n_jobs)
+        self.threads_per_fold = [
+            max(1, self.n_jobs // self.fold_jobs + (slot < self.n_jobs % self.fold_jobs))
+            for slot in range(self.fold_jobs)
+        ]
+        self.thread_slots = None
+        self.dmatrix = None
+        self.data = None
+        self.labels = None
+        self.feature_names = None
+        self.timing = {}
+    
+    def build(self, X, y):
+        start = time.perf_counter()
+        self.feature_names = list(X.columns) if hasattr(X, 'columns') else None
+        self.data = np.ascontiguousarray(X, dtype=np.float32)
+        self.labels = np.asarray(y)
+        self.dmatrix = xgb.QuantileDMatrix(self.data, label=self.labels, feature_names=self.feature_names,
+                                           max_bin=self.max_bin, nthread=self.n_jobs)
+        self.timing['build_seconds'] = time.perf_counter() - start
+        return self.dmatrix
+    
+    def _score(self, y_true, predictions, scoring):
+        if scoring == 'roc_auc':
+            if predictions.ndim > 1:
+                return roc_auc_score(y_true, predictions, multi_class='ovr')
+            return roc_auc_score(y_true, predictions)
+        if scoring == 'accuracy':
+            labels = np.argmax(predictions, axis=1) if predictions.ndim > 1 else (predictions >= 0.5).astype(int)
+            return accuracy_score(y_true, labels)
+        raise ValueError(f"Unknown scoring: {scoring}")
+    
+    def _run_fold(self, fold, train_index, test_index, scoring):
+        nthread = self.thread_slots.get()
+        try:
+            start = time.perf_counter()
+            dtrain = xgb.QuantileDMatrix(self.data[train_index], label=self.labels[train_index],
+                                         feature_names=self.feature_names, ref=self.dmatrix, nthread=nthread)
+            params, num_boost_round = native_params({
+                **self.params,
+                'tree_method': 'hist',
+                'max_bin': self.max_bin,
+                'nthread': nthread
+            })
+            booster = xgb.train(params, dtrain, num_boost_round)
+            train_seconds = time.perf_counter() - start
+        
+            predictions = booster.inplace_predict(self.data[test_index], validate_features=False)
+        finally:
+            self.thread_slots.put(nthread)
+        return {
+            'fold': fold,
+            'score': self._score(self.labels[test_index], predictions, scoring),
+            'n_train': len(train_index),
+            'n_test': len(test_index),
+            'nthread': nthread,
+            'train_seconds': train_seconds,
+            'total_seconds': time.perf_counter() - start
+        }
+    
+    def cross_validate(self, X, y, scoring='accuracy'):
+        start = time.perf_counter()
+        self.build(X, y)
+        
+        splitter = StratifiedKFold(n_splits=self.n_folds, shuffle=True, random_state=RANDOM_STATE)
+        folds = [
+            (fold, train_index, test_index)
+            for fold, (train_index, test_index) in enumerate(splitter.split(np.zeros(len(self.labels)), self.labels))
+        ]
+        
+        self.thread_slots = queue.Queue()
+        for nthread in self.threads_per_fold:
+            self.thread_slots.put(nthread)
+        with ThreadPoolExecutor(max_workers=self.fold_jobs) as executor:
+            fold_results = list(executor.map(lambda args: self._run_fold(*args, scoring), folds))
+        
+        scores = np.array([result['score'] for result in fold_results])
+        self.timing['total_seconds'] = time.perf_counter() - start
+        return {
+            'mean_score': scores.mean(),
+            'std_score': scores.std(),
+            'scores': scores,
+            'folds': fold_results,
+            'fold_jobs': self.fold_jobs,
+            'threads_per_fold': self.threads_per_fold,
+            'build_seconds': self.timing['build_seconds'],
+            'total_seconds': self.timing['total_seconds']
+        }
\ No newline at end of file
@@ -1,88 +1,418 @@
 import pandas as pd
 import numpy as np
-from src.utils.helpers import detect_outliers
+import joblib
+import tracemalloc
+import time
+import os
+from scipy import sparse
 from src.utils.constants import FEATURE_MAPPINGS
+from src.utils.helpers import QuantileSketch
+from src.data_processing.data_validator import DataValidator
+from config.settings import MODELS_DIR, PROCESSED_DATA_DIR, CHUNK_SIZE
 from sklearn.preprocessing import StandardScaler
 
 class DataCleaner:
     def __init__(self):
         self.scaler = StandardScaler()
         self.fitted = False
+        self.validator = DataValidator()
+        self.fill_values = None
+        self.fill_strategy = None
+        self.outlier_bounds = None
+        self.category_vocabularies = None
+        self.input_dtypes = None
+        self.encoded_feature_names = None
+        self.compaction_report = None
+        self.stage_memory_report = {}
         
-    def handle_missing_values(self, data, strategy='median'):
-        data_clean = data.copy()
+    def fit_imputer(self, data, strategy='median'):
+        numeric_columns = data.select_dtypes(include=[np.number]).columns
+        other_columns = data.columns.difference(numeric_columns, sort=False)
         
-        for column in data_clean.columns:
-            if data_clean[column].dtype in ['int64', 'float64']:
-                if strategy == 'median':
-                    fill_value = data_clean[column].median()
-                else:
-                    fill_value = data_clean[column].mean()
-                data_clean[column] = data_clean[column].fillna(fill_value)
-            else:
-                data_clean[column] = data_clean[column].fillna(data_clean[column].mode()[0])
+        if strategy == 'median':
+            numeric_fill = data[numeric_columns].median()
+        else:
+            numeric_fill = data[numeric_columns].mean()
+        other_fill = data[other_columns].mode().iloc[0] if len(other_columns) else pd.Series(dtype=object)
                 
-        return data_clean
+        self.fill_values = {**numeric_fill.dropna().to_dict(), **other_fill.dropna().to_dict()}
+        self.fill_strategy = strategy
+        return self
+    
+    def transform_missing(self, data, inplace=False):
+        fill_values = {column: value for column, value in self.fill_values.items() if column in data.columns}
+        if not inplace:
+            data = data.copy()
+        for column, value in fill_values.items():
+            values = data[column]
+            if isinstance(values.dtype, pd.CategoricalDtype) and value not in values.cat.categories:
+                data[column] = values.cat.add_categories([value])
+        data.fillna(fill_values, inplace=True)
+        return data
+    
+    def handle_missing_values(self, data, strategy='median', fit=True, inplace=False):
+        if fit and self.fill_values is None:
+            self.fit_imputer(data, strategy)
+        if self.fill_values is None:
+            return data if inplace else data.copy()
+        return self.transform_missing(data, inplace)
+    
+    def get_state(self):
+        return {
+            'fill_strategy': self.fill_strategy,
+            'fill_values': self.fill_values,
+            'outlier_bounds': self.outlier_bounds,
+            'category_vocabularies': self.category_vocabularies,
+            'input_dtypes': self.input_dtypes,
+            'scaler': self.scaler if self.fitted else None
+        }
     
-    def remove_duplicates(self, data):
+    def set_state(self, state):
+        self.fill_strategy = state['fill_strategy']
+        self.fill_values = state['fill_values']
+        self.outlier_bounds = state['outlier_bounds']
+        self.category_vocabularies = state['category_vocabularies']
+        self.input_dtypes = state.get('input_dtypes')
+        if state.get('scaler') is not None:
+            self.scaler = state['scaler']
+            self.fitted = True
+        return self
+    
+    def save_state(self, path=None):
+        if path is None:
+            path = os.path.join(MODELS_DIR, 'data_cleaner.pkl')
+        joblib.dump(self.get_state(), path)
+    
+    def load_state(self, path=None):
+        if path is None:
+            path = os.path.join(MODELS_DIR, 'data_cleaner.pkl')
+        if os.path.exists(path):
+            self.set_state(joblib.load(path))
+    
+    def remove_duplicates(self, data, inplace=False):
+        if inplace:
+            data.drop_duplicates(inplace=True)
+            return data
         return data.drop_duplicates()
     
-    def handle_outliers(self, data, method='iqr', factor=1.5):
-        data_clean = data.copy()
+    def fit_outlier_bounds(self, data, factor=1.5):
+        numeric_data = data.select_dtypes(include=[np.number])
+        quartiles = numeric_data.quantile([0.25, 0.75])
+        IQR = quartiles.loc[0.75] - quartiles.loc[0.25]
+        
+        self.outlier_bounds = {
+            'lower': quartiles.loc[0.25] - factor * IQR,
+            'upper': quartiles.loc[0.75] + factor * IQR
+        }
+        return self
+    
+    def handle_outliers(self, data, method='iqr', factor=1.5, fit=True, inplace=False):
+        if fit and self.outlier_bounds is None:
+            self.fit_outlier_bounds(data, factor)
+        if self.outlier_bounds is None or method not in ['remove', 'cap']:
+            return data if inplace else data.copy()
+        
+        columns = [c for c in self.outlier_bounds['lower'].index if c in data.columns]
+        lower = self.outlier_bounds['lower'][columns]
+        upper = self.outlier_bounds['upper'][columns]
+        data_clean = data if inplace else data.copy()
         
-        for column in data_clean.select_dtypes(include=[np.number]).columns:
-            outliers = detect_outliers(data_clean[column], method, factor)
-            if method == 'remove':
+        if method == 'remove':
+            outliers = (data_clean[columns].lt(lower) | data_clean[columns].gt(upper)).any(axis=1)
+            if inplace:
+                data_clean.drop(index=data_clean.index[outliers.to_numpy()], inplace=True)
+            else:
                 data_clean = data_clean[~outliers]
-            elif method == 'cap':
-                Q1 = data_clean[column].quantile(0.25)
-                Q3 = data_clean[column].quantile(0.75)
-                IQR = Q3 - Q1
-                lower = Q1 - factor * IQR
-                upper = Q3 + factor * IQR
-                data_clean[column] = data_clean[column].clip(lower, upper)
+        elif inplace:
+            for column in columns:
+                data_clean[column] = data_clean[column].clip(lower[column], upper[column])
+        else:
+            data_clean[columns] = data_clean[columns].clip(lower, upper, axis=1)
                 
         return data_clean
     
-    def encode_categorical(self, data):
-        data_encoded = data.copy()
+    def fit_encoder(self, data):
+        categorical_columns = [c for c in data.select_dtypes(include=['object', 'category']).columns
+                               if c not in FEATURE_MAPPINGS]
+        self.category_vocabularies = {
+            column: sorted(data[column].dropna().unique().tolist(), key=str)
+            for column in categorical_columns
+        }
+        return self
         
+    def encode_categorical(self, data, fit=True, sparse_output=False, inplace=False):
+        if fit and self.category_vocabularies is None:
+            self.fit_encoder(data)
+        vocabularies = {c: v for c, v in (self.category_vocabularies or {}).items() if c in data.columns}
+        
+        if inplace:
+            data_encoded = data
+        else:
+            data_encoded = data[[c for c in data.columns if c not in vocabularies]].copy()
         for column, mapping in FEATURE_MAPPINGS.items():
             if column in data_encoded.columns:
-                data_encoded[column] = data_encoded[column].map(mapping)
+                values = data_encoded[column]
+                if isinstance(values.dtype, pd.CategoricalDtype):
+                    values = values.astype(object)
+                data_encoded[column] = values.map(mapping)
                 
-        for column in data_encoded.select_dtypes(include=['object']).columns:
-            data_encoded = pd.get_dummies(data_encoded, columns=[column], prefix=column)
+        dummy_columns = []
+        rows = []
+        columns = []
+        for column, vocabulary in vocabularies.items():
+            codes = pd.Categorical(data[column], categories=vocabulary).codes
+            present = np.flatnonzero(codes >= 0)
+            rows.append(present)
+            columns.append(len(dummy_columns) + codes[present])
+            dummy_columns.extend(f'{column}_{value}' for value in vocabulary)
             
-        return data_encoded
+        rows = np.concatenate(rows) if rows else np.empty(0, dtype=np.intp)
+        columns = np.concatenate(columns) if columns else np.empty(0, dtype=np.intp)
+        if inplace and vocabularies:
+            data_encoded.drop(columns=list(vocabularies), inplace=True)
+        self.encoded_feature_names = list(data_encoded.columns) + dummy_columns
+        
+        if sparse_output:
+            dummies = sparse.csr_matrix(
+                (np.ones(len(rows), dtype=np.float32), (rows, columns)),
+                shape=(len(data), len(dummy_columns))
+            )
+            return sparse.hstack([sparse.csr_matrix(data_encoded.to_numpy(dtype=np.float32)), dummies],
+                                 format='csr')
+        
+        if not dummy_columns:
+            return data_encoded
+        
+        dummies = np.zeros((len(data_encoded), len(dummy_columns)), dtype=np.uint8)
+        dummies[rows, columns] = 1
+        if inplace:
+            data_encoded[dummy_columns] = dummies
+            return data_encoded
+        return pd.concat([data_encoded, pd.DataFrame(dummies, columns=dummy_columns, index=data.index)], axis=1)
     
-    def normalize_features(self, data, fit=True):
+    def normalize_features(self, data, fit=True, inplace=False):
         numeric_columns = data.select_dtypes(include=[np.number]).columns
-        data_normalized = data.copy()
         
-        if fit and not self.fitted:
-            data_normalized[numeric_columns] = self.scaler.fit_transform(data[numeric_columns])
-            self.fitted = True
-        elif self.fitted:
-            data_normalized[numeric_columns] = self.scaler.transform(data[numeric_columns])
-        else:
+        if not inplace:
+            data_normalized = data.copy()
+            if fit and not self.fitted:
+                data_normalized[numeric_columns] = self.scaler.fit_transform(data[numeric_columns])
+                self.fitted = True
+            elif self.fitted:
+                data_normalized[numeric_columns] = self.scaler.transform(data[numeric_columns])
             return data_normalized
             
-        return data_normalized
+        if fit and not self.fitted:
+            for start in range(0, len(data), CHUNK_SIZE):
+                self.scaler.partial_fit(data[numeric_columns].iloc[start:start + CHUNK_SIZE])
+            self.fitted = True
+        if self.fitted:
+            columns = getattr(self.scaler, 'feature_names_in_', numeric_columns)
+            for column, mean, scale in zip(columns, self.scaler.mean_, self.scaler.scale_):
+                data[column] = (data[column] - mean) / scale
+    
+        return data
+    
+    def compact_dtypes(self, data, inplace=False):
+        compacted, self.compaction_report = self.validator.compact_dtypes(data, inplace)
+        return compacted
     
     def clean_pipeline(self, data, remove_duplicates=True, handle_missing=True, 
-                      handle_outliers=True, encode_categorical=True, normalize=True):
-        cleaned_data = data.copy()
+                      handle_outliers=True, encode_categorical=True, normalize=True,
+                      compact=False, inplace=False, profile_memory=False, fit=True):
+        if fit and self.input_dtypes is None:
+            self.input_dtypes = dict(data.dtypes.items())
         
+        stages = []
+        if not inplace:
+            stages.append(('copy', lambda d: d.copy()))
         if remove_duplicates:
-            cleaned_data = self.remove_duplicates(cleaned_data)
+            stages.append(('remove_duplicates', lambda d: self.remove_duplicates(d, inplace=True)))
         if handle_missing:
-            cleaned_data = self.handle_missing_values(cleaned_data)
+            stages.append(('handle_missing', lambda d: self.handle_missing_values(d, fit=fit, inplace=True)))
         if encode_categorical:
-            cleaned_data = self.encode_categorical(cleaned_data)
+            stages.append(('encode_categorical', lambda d: self.encode_categorical(d, fit=fit, inplace=True)))
         if handle_outliers:
-            cleaned_data = self.handle_outliers(cleaned_data)
+            stages.append(('handle_outliers', lambda d: self.handle_outliers(d, fit=fit, inplace=True)))
+        if compact:
+            stages.append(('compact', lambda d: self.compact_dtypes(d, inplace=True)))
         if normalize:
-            cleaned_data = self.normalize_features(cleaned_data)
+            stages.append(('normalize', lambda d: self.normalize_features(d, fit=fit, inplace=True)))
+        
+        if not profile_memory:
+            cleaned_data = data
+            for _, stage in stages:
+                cleaned_data = stage(cleaned_data)
+            return cleaned_data
+        
+        self.stage_memory_report = {}
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        try:
+            cleaned_data = data
+            for name, stage in stages:
+                cleaned_data = self._run_profiled_stage(name, stage, cleaned_data)
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
+            
+        return cleaned_data
+    
+    def _run_profiled_stage(self, name, stage, data):
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        start = time.perf_counter()
+        result = stage(data)
+        current, peak = tracemalloc.get_traced_memory()
+        
+        self.stage_memory_report[name] = {
+            'peak_bytes': peak - baseline,
+            'retained_bytes': current - baseline,
+            'seconds': time.perf_counter() - start
+        }
+        return result
+    
+    def get_stage_memory_report(self):
+        return self.stage_memory_report
+    
+    def fit_streaming(self, chunks, strategy='median', factor=1.5, sketch_capacity=10000):
+        moments = StandardScaler()
+        sketches = {}
+        category_counts = {}
+        missing_counts = None
+        numeric_columns = None
+        sample = None
+        n_rows = 0
+        
+        for chunk in chunks:
+            if sample is None:
+                sample = chunk.head(1)
+                numeric_columns = list(chunk.select_dtypes(include=[np.number]).columns)
+            
+            moments.partial_fit(chunk[numeric_columns])
+            for column in numeric_columns:
+                sketches.setdefault(column, QuantileSketch(sketch_capacity)).update(chunk[column].to_numpy())
+            for column in chunk.columns.difference(numeric_columns, sort=False):
+                counts = chunk[column].value_counts()
+                category_counts[column] = counts.add(category_counts[column], fill_value=0) \
+                    if column in category_counts else counts
+            
+            missing = chunk.isnull().sum()
+            missing_counts = missing if missing_counts is None else missing_counts.add(missing, fill_value=0)
+            n_rows += len(chunk)
+        
+        if sample is None:
+            raise ValueError("No data chunks to fit")
+        
+        category_counts = {column: counts[counts > 0] for column, counts in category_counts.items()}
+        n_observed = np.broadcast_to(moments.n_samples_seen_, len(numeric_columns))
+        
+        self.fill_strategy = strategy
+        self.fill_values = {}
+        for i, column in enumerate(numeric_columns):
+            if n_observed[i] > 0:
+                self.fill_values[column] = sketches[column].quantile(0.5) if strategy == 'median' else moments.mean_[i]
+        for column, counts in category_counts.items():
+            if len(counts):
+                self.fill_values[column] = counts.idxmax()
+        
+        lower = {}
+        upper = {}
+        for column in numeric_columns:
+            if column in self.fill_values:
+                sketches[column].update([self.fill_values[column]], weight=missing_counts[column])
+            Q1, Q3 = sketches[column].quantile([0.25, 0.75])
+            lower[column] = Q1 - factor * (Q3 - Q1)
+            upper[column] = Q3 + factor * (Q3 - Q1)
+        self.outlier_bounds = {'lower': pd.Series(lower, dtype=float), 'upper': pd.Series(upper, dtype=float)}
+        
+        self.category_vocabularies = {
+            column: sorted(counts.index.tolist(), key=str)
+            for column, counts in category_counts.items() if column not in FEATURE_MAPPINGS
+        }
+        
+        imputed_counts = {}
+        for column, counts in category_counts.items():
+            counts = counts.copy()
+            if column in self.fill_values:
+                counts[self.fill_values[column]] += missing_counts[column]
+            imputed_counts[column] = counts
+        
+        column_moments = {}
+        for i, column in enumerate(numeric_columns):
+            fill = self.fill_values.get(column, np.nan)
+            n_missing = missing_counts[column] if column in self.fill_values else 0
+            column_moments[column] = self._merge_moments(
+                n_observed[i], moments.mean_[i], moments.var_[i], n_missing, fill
+            )
+        for column, counts in imputed_counts.items():
+            if column in FEATURE_MAPPINGS:
+                mapped = counts.index.map(lambda value: FEATURE_MAPPINGS[column].get(value, np.nan))
+                known = ~np.isnan(np.asarray(mapped, dtype=float))
+                column_moments[column] = self._weighted_moments(
+                    np.asarray(mapped, dtype=float)[known], counts.to_numpy(dtype=float)[known]
+                )
+            else:
+                for value, count in counts.items():
+                    p = count / n_rows
+                    column_moments[f'{column}_{value}'] = (p, p * (1 - p))
+        
+        encoded_sample = self.encode_categorical(self.transform_missing(sample), fit=False)
+        scaled_columns = list(encoded_sample.select_dtypes(include=[np.number]).columns)
+        means = np.array([column_moments.get(c, (0.0, 0.0))[0] for c in scaled_columns])
+        variances = np.array([column_moments.get(c, (0.0, 0.0))[1] for c in scaled_columns])
+        
+        self.scaler = StandardScaler()
+        self.scaler.mean_ = means
+        self.scaler.var_ = variances
+        self.scaler.scale_ = np.where(variances > 0, np.sqrt(variances), 1.0)
+        self.scaler.n_samples_seen_ = n_rows
+        self.scaler.n_features_in_ = len(scaled_columns)
+        self.scaler.feature_names_in_ = np.asarray(scaled_columns, dtype=object)
+        self.fitted = True
+        return self
+    
+    def _merge_moments(self, n_observed, mean, var, n_missing, fill):
+        n_total = n_observed + n_missing
+        if n_total == 0:
+            return np.nan, np.nan
+        if n_missing == 0:
+            return mean, var
+        if n_observed == 0:
+            return fill, 0.0
+        
+        merged_mean = (n_observed * mean + n_missing * fill) / n_total
+        merged_var = (n_observed * (var + (mean - merged_mean) ** 2) + n_missing * (fill - merged_mean) ** 2) / n_total
+        return merged_mean, merged_var
+    
+    def _weighted_moments(self, values, weights):
+        if weights.sum() == 0:
+            return np.nan, np.nan
+        mean = np.average(values, weights=weights)
+        return mean, np.average((values - mean) ** 2, weights=weights)
+    
+    def transform_streaming(self, chunks, output_path=None, passthrough_columns=None, **pipeline_kwargs):
+        if output_path is None:
+            output_path = os.path.join(PROCESSED_DATA_DIR, 'cleaned_data.csv')
+        passthrough_columns = passthrough_columns or []
+        
+        rows_written = 0
+        for i, chunk in enumerate(chunks):
+            passthrough = chunk[[c for c in passthrough_columns if c in chunk.columns]]
+            cleaned = self.clean_pipeline(chunk.drop(columns=passthrough.columns), inplace=True, **pipeline_kwargs)
+            cleaned = cleaned.join(passthrough)
             
-        return cleaned_data
\ No newline at end of file
+            cleaned.to_csv(output_path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+            rows_written += len(cleaned)
+        
+        return {'output_path': output_path, 'rows': rows_written}
+    
+    def clean_out_of_core(self, chunk_source, output_path=None, passthrough_columns=None,
+                          strategy='median', factor=1.5, **pipeline_kwargs):
+        passthrough_columns = passthrough_columns or []
+        self.fit_streaming(
+            (chunk.drop(columns=[c for c in passthrough_columns if c in chunk.columns]) for chunk in chunk_source()),
+            strategy, factor
+        )
+        return self.transform_streaming(chunk_source(), output_path, passthrough_columns, **pipeline_kwargs)
\ No newline at end of file
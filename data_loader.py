@@ -1,20 +1,184 @@
 import pandas as pd
 import numpy as np
-from src.utils.helpers import load_csv_data
-from config.settings import RAW_DATA_DIR, DEFAULT_FEATURES
+from pandas.api.types import union_categoricals
+from concurrent.futures import ProcessPoolExecutor
+from src.utils.helpers import (load_csv_data, create_directories, get_file_fingerprint,
+                               save_npy_columns, load_npy_columns)
+from src.utils.constants import FEATURE_MAPPINGS
+from src.data_processing.data_validator import DataValidator
+from config.settings import RAW_DATA_DIR, CACHE_DIR, DEFAULT_FEATURES, FEATURE_DTYPES, CHUNK_SIZE
+import shutil
+import json
+import glob
+import time
+import re
 import os
 
+def schema_dtype(column, dtype):
+    if dtype == 'category' and column in FEATURE_MAPPINGS:
+        return pd.CategoricalDtype(categories=list(FEATURE_MAPPINGS[column]))
+    return dtype
+
+def apply_dtypes(data, dtypes):
+    serving_dtypes = {}
+    for column, dtype in dtypes.items():
+        if column not in data.columns:
+            continue
+        dtype = pd.api.types.pandas_dtype(dtype)
+        if isinstance(dtype, np.dtype) and dtype.kind in 'biu':
+            dtype = np.dtype(np.float64)
+        if data[column].dtype != dtype:
+            serving_dtypes[column] = dtype
+    return data.astype(serving_dtypes) if serving_dtypes else data
+
+def _read_shard(path, columns=None, dtype=None):
+    start = time.perf_counter()
+    usecols = (lambda c: c in columns) if columns else None
+    frame = pd.read_csv(path, usecols=usecols, dtype=dtype)
+    return frame, time.perf_counter() - start
+
 class DataLoader:
-    def __init__(self, data_path=None):
+    def __init__(self, data_path=None, use_cache=False, cache_dir=None, n_jobs=None):
         self.data_path = data_path or os.path.join(RAW_DATA_DIR, 'dry_eye_dataset.csv')
         self.data = None
+        self.n_jobs = n_jobs
+        self.shard_info = []
+        self.use_cache = use_cache
+        self.cache_dir = cache_dir or CACHE_DIR
+        self.cache_path = None
+        self.compaction_report = None
         self.features = DEFAULT_FEATURES
+        self.dtype_schema = {f: schema_dtype(f, FEATURE_DTYPES[f]) for f in self.features if f in FEATURE_DTYPES}
         
     def load_data(self):
-        self.data = load_csv_data(self.data_path)
+        shard_paths = self.get_shard_paths()
+        if len(shard_paths) > 1:
+            self.data = self._load_shards(shard_paths)
+        else:
+            self.data = load_csv_data(shard_paths[0])
         return self.data
     
-    def get_features_and_target(self, target_column='dry_eye_disease'):
+    def get_shard_paths(self):
+        if os.path.isdir(self.data_path):
+            shard_paths = sorted(glob.glob(os.path.join(self.data_path, '*.csv')))
+        elif glob.has_magic(self.data_path):
+            shard_paths = sorted(glob.glob(self.data_path))
+        else:
+            return [self.data_path]
+        
+        if not shard_paths:
+            raise FileNotFoundError(f"No CSV shards found at {self.data_path}")
+        return shard_paths
+    
+    def _load_shards(self, shard_paths, columns=None, dtype=None):
+        max_workers = self.n_jobs or min(len(shard_paths), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(_read_shard, path, columns, dtype) for path in shard_paths]
+            results = [future.result() for future in futures]
+        
+        self.shard_info = [
+            {'path': path, 'rows': len(frame), 'seconds': seconds}
+            for path, (frame, seconds) in zip(shard_paths, results)
+        ]
+        return self._concat_shards(shard_paths, [frame for frame, _ in results])
+    
+    def _concat_shards(self, shard_paths, frames):
+        columns = list(frames[0].columns)
+        for path, frame in zip(shard_paths[1:], frames[1:]):
+            if list(frame.columns) != columns:
+                raise ValueError(f"Shard {path} columns {list(frame.columns)} do not match {columns}")
+        
+        offsets = np.cumsum([0] + [len(frame) for frame in frames])
+        data = {}
+        for column in columns:
+            dtypes = [frame[column].dtype for frame in frames]
+            if all(isinstance(dtype, pd.CategoricalDtype) for dtype in dtypes):
+                data[column] = union_categoricals([frame[column] for frame in frames])
+                continue
+            
+            if all(isinstance(dtype, np.dtype) and dtype.kind in 'biuf' for dtype in dtypes):
+                dtype = np.result_type(*dtypes)
+            else:
+                dtype = object
+            
+            values = np.empty(offsets[-1], dtype=dtype)
+            for frame, start, end in zip(frames, offsets[:-1], offsets[1:]):
+                values[start:end] = frame[column].to_numpy(dtype=dtype)
+            data[column] = values
+        
+        return pd.DataFrame(data, copy=False)
+    
+    def iter_chunks(self, chunksize=CHUNK_SIZE, target_column='dry_eye_disease'):
+        columns = self._get_usecols(target_column)
+        
+        for path in self.get_shard_paths():
+            reader = pd.read_csv(path, usecols=lambda c: c in columns,
+                                 dtype=self.dtype_schema, chunksize=chunksize)
+            for chunk in reader:
+                yield chunk
+    
+    def _get_usecols(self, target_column):
+        columns = set(self.features)
+        if target_column:
+            columns.add(target_column)
+        return columns
+    
+    def load_cached(self, target_column='dry_eye_disease', chunksize=CHUNK_SIZE):
+        stem = re.sub(r'[^\w.-]', '_', os.path.splitext(os.path.basename(os.path.normpath(self.data_path)))[0])
+        fingerprint = get_file_fingerprint(self.get_shard_paths(), {
+            'features': self.features,
+            'schema': {c: list(t.categories) if isinstance(t, pd.CategoricalDtype) else t
+                       for c, t in self.dtype_schema.items()},
+            'target': target_column
+        })
+        self.cache_path = os.path.join(self.cache_dir, f'{stem}_{fingerprint}')
+        
+        if not os.path.exists(os.path.join(self.cache_path, 'meta.json')):
+            X, y = self._get_features_and_target_chunked(target_column, chunksize or CHUNK_SIZE)
+            if X is None:
+                return None, None
+            frame = X if y is None else X.assign(**{target_column: y})
+            
+            create_directories([self.cache_dir])
+            self._clear_stale_cache(stem)
+            save_npy_columns(frame, self.cache_path, {
+                'source': os.path.abspath(self.data_path),
+                'fingerprint': fingerprint,
+                'target': target_column if y is not None else None
+            })
+        
+        frame, meta = load_npy_columns(self.cache_path, mmap_mode='c')
+        if meta['target'] is None:
+            return frame, None
+        return frame.drop(columns=[meta['target']]), frame[meta['target']]
+    
+    def _clear_stale_cache(self, stem):
+        pattern = re.compile(re.escape(stem) + r'_[0-9a-f]{16}')
+        source = os.path.abspath(self.data_path)
+        for path in glob.glob(os.path.join(self.cache_dir, f'{glob.escape(stem)}_*')):
+            if path == self.cache_path or not pattern.fullmatch(os.path.basename(path)):
+                continue
+            try:
+                with open(os.path.join(path, 'meta.json'), 'r') as f:
+                    if json.load(f).get('source') != source:
+                        continue
+            except (OSError, ValueError):
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+    
+    def get_features_and_target(self, target_column='dry_eye_disease', chunksize=None, compact=False):
+        X, y = self._get_features_and_target(target_column, chunksize)
+        if compact and X is not None:
+            X, self.compaction_report = DataValidator().compact_dtypes(X)
+        return X, y
+    
+    def _get_features_and_target(self, target_column, chunksize):
+        if self.data is None and self.use_cache:
+            return self.load_cached(target_column, chunksize)
+        
+        if self.data is None and chunksize:
+            return self._get_features_and_target_chunked(target_column, chunksize)
+        
         if self.data is None:
             self.load_data()
             
@@ -24,8 +188,40 @@ class DataLoader:
         
         return X, y
     
+    def _get_features_and_target_chunked(self, target_column, chunksize):
+        shard_paths = self.get_shard_paths()
+        if len(shard_paths) > 1:
+            frame = self._load_shards(shard_paths, self._get_usecols(target_column), self.dtype_schema)
+            available_features = [f for f in self.features if f in frame.columns]
+            y = frame[target_column] if target_column in frame.columns else None
+            return frame[available_features], y
+        
+        X_chunks = []
+        y_chunks = []
+        
+        for chunk in self.iter_chunks(chunksize, target_column):
+            available_features = [f for f in self.features if f in chunk.columns]
+            X_chunks.append(chunk[available_features])
+            if target_column in chunk.columns:
+                y_chunks.append(chunk[target_column])
+        
+        if not X_chunks:
+            return None, None
+        
+        X = pd.concat(X_chunks, ignore_index=True)
+        categorical_columns = {c: t for c, t in self.dtype_schema.items()
+                               if t == 'category' and c in X.columns}
+        if categorical_columns:
+            X = X.astype(categorical_columns)
+        y = pd.concat(y_chunks, ignore_index=True) if y_chunks else None
+        
+        return X, y
+    
+    def apply_schema(self, data, dtypes=None):
+        return apply_dtypes(data, dtypes or self.dtype_schema)
+    
     def get_patient_data(self, patient_data_dict):
-        return pd.DataFrame([patient_data_dict])
+        return self.apply_schema(pd.DataFrame([patient_data_dict]))
     
     def validate_columns(self, required_columns):
         if self.data is None:
@@ -34,10 +230,13 @@ class DataLoader:
     
     def get_data_info(self):
         if self.data is None:
-            return None
-        return {
+            return {'shards': self.shard_info} if self.shard_info else None
+        info = {
             'shape': self.data.shape,
             'columns': list(self.data.columns),
             'missing_values': self.data.isnull().sum().to_dict(),
             'data_types': self.data.dtypes.to_dict()
-        }
\ No newline at end of file
+        }
+        if self.shard_info:
+            info['shards'] = self.shard_info
+        return info
\ No newline at end of file
@@ -77,6 +77,58 @@ class DataValidator:
         
         return quality_issues
     
+    def get_compact_dtypes(self, data):
+        dtypes = {}
+        
+        for column in data.columns:
+            values = data[column]
+            if len(values) == 0 or not pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values):
+                continue
+            
+            rule = self.validation_rules.get(column, {})
+            has_missing = values.isnull().any()
+            is_integral = not has_missing and (
+                pd.api.types.is_integer_dtype(values) or (values % 1 == 0).all()
+            )
+            
+            if 'values' in rule and is_integral and values.isin([0, 1]).all():
+                dtypes[column] = 'bool'
+            elif is_integral:
+                lower = min(rule.get('min', values.min()), values.min())
+                upper = max(rule.get('max', values.max()), values.max())
+                dtypes[column] = self._smallest_integer_dtype(lower, upper)
+            else:
+                dtypes[column] = 'float32'
+        
+        return {column: dtype for column, dtype in dtypes.items() if data[column].dtype != dtype}
+    
+    def _smallest_integer_dtype(self, lower, upper):
+        for dtype in [np.uint8, np.int8, np.uint16, np.int16, np.uint32, np.int32]:
+            info = np.iinfo(dtype)
+            if info.min <= lower and upper <= info.max:
+                return np.dtype(dtype).name
+        return 'int64'
+    
+    def compact_dtypes(self, data, inplace=False):
+        dtypes = self.get_compact_dtypes(data)
+        bytes_before = int(data.memory_usage(deep=True).sum())
+        if inplace:
+            for column, dtype in dtypes.items():
+                data[column] = data[column].astype(dtype)
+            compacted = data
+        else:
+            compacted = data.astype(dtypes) if dtypes else data
+        bytes_after = int(compacted.memory_usage(deep=True).sum())
+        
+        report = {
+            'bytes_before': bytes_before,
+            'bytes_after': bytes_after,
+            'bytes_saved': bytes_before - bytes_after,
+            'compression_ratio': bytes_before / bytes_after if bytes_after else 1.0,
+            'dtypes': {column: str(dtype) for column, dtype in dtypes.items()}
+        }
+        return compacted, report
+    
     def validate_all(self, data, required_columns=None):
         validation_results = {
             'is_valid': True,
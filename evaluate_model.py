@@ -7,6 +7,7 @@ from src.data_processing.data_cleaner import DataCleaner
 from src.data_processing.feature_engineer import FeatureEngineer
 from src.modeling.xgboost_predictor import XGBoostPredictor
 from src.visualization.result_visualizer import ResultVisualizer
+from config.settings import CHUNK_SIZE
 from sklearn.metrics import classification_report, confusion_matrix, roc_curve, auc
 from sklearn.model_selection import train_test_split
 import numpy as np
@@ -15,7 +16,7 @@ import pandas as pd
 def evaluate_models():
     print("Evaluating trained models...")
     
-    data_loader = DataLoader()
+    data_loader = DataLoader(use_cache=True)
     data_cleaner = DataCleaner()
     feature_engineer = FeatureEngineer()
     predictor = XGBoostPredictor()
@@ -23,6 +24,8 @@ def evaluate_models():
     
     try:
         predictor.load_models()
+        data_cleaner.load_state()
+        feature_engineer.load_state()
         print("Models loaded successfully")
     except Exception as e:
         print(f"Error loading models: {e}")
@@ -30,7 +33,7 @@ def evaluate_models():
         return
     
     print("Loading test data...")
-    X, y = data_loader.get_features_and_target()
+    X, y = data_loader.get_features_and_target(chunksize=CHUNK_SIZE)
     if X is None or y is None:
         print("Error: Could not load data")
         return
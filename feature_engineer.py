@@ -1,89 +1,250 @@
 import pandas as pd
 import numpy as np
-from src.utils.helpers import calculate_age_group
+import joblib
+import os
+from src.utils.constants import AGE_GROUP_BINS, AGE_GROUP_LABELS
+from config.settings import MODELS_DIR
+
+def _row_mean(*columns):
+    stacked = np.column_stack(columns)
+    counts = (~np.isnan(stacked)).sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.nansum(stacked, axis=1) / counts
 
 class FeatureEngineer:
     def __init__(self):
         self.created_features = []
+        self.feature_plan = None
+        self.full_plan = None
+        self.plan_options = None
+        self.input_columns = None
+        self.required_inputs = None
+        self.output_features = None
+        self.input_dtypes = None
+        self.feature_names = None
+        self.feature_dtypes = None
+        self.output_dtype = np.float64
+        self.is_fitted = False
         
-    def create_interaction_features(self, data):
-        data_enhanced = data.copy()
+    def _interaction_plan(self, columns):
+        plan = []
         
-        if 'screen_time' in data.columns and 'blink_frequency' in data.columns:
-            data_enhanced['screen_blink_ratio'] = data['screen_time'] / (data['blink_frequency'] + 1)
-            self.created_features.append('screen_blink_ratio')
-            
-        if 'age' in data.columns and 'stress_level' in data.columns:
-            data_enhanced['age_stress_interaction'] = data['age'] * data['stress_level']
-            self.created_features.append('age_stress_interaction')
-            
-        if 'sleep_quality' in data.columns and 'stress_level' in data.columns:
-            data_enhanced['sleep_stress_score'] = data['sleep_quality'] / (data['stress_level'] + 1)
-            self.created_features.append('sleep_stress_score')
-            
-        return data_enhanced
+        if 'screen_time' in columns and 'blink_frequency' in columns:
+            plan.append(('screen_blink_ratio', ['screen_time', 'blink_frequency'],
+                         lambda d: d['screen_time'] / (d['blink_frequency'] + 1)))
+        
+        if 'age' in columns and 'stress_level' in columns:
+            plan.append(('age_stress_interaction', ['age', 'stress_level'],
+                         lambda d: d['age'] * d['stress_level']))
+        
+        if 'sleep_quality' in columns and 'stress_level' in columns:
+            plan.append(('sleep_stress_score', ['sleep_quality', 'stress_level'],
+                         lambda d: d['sleep_quality'] / (d['stress_level'] + 1)))
+        
+        return plan
     
-    def create_composite_features(self, data):
-        data_enhanced = data.copy()
+    def _composite_plan(self, columns):
+        plan = []
         
         lifestyle_columns = ['sleep_quality', 'physical_activity', 'stress_level']
-        available_lifestyle = [col for col in lifestyle_columns if col in data.columns]
+        available_lifestyle = [col for col in lifestyle_columns if col in columns]
         
         if len(available_lifestyle) >= 2:
-            data_enhanced['lifestyle_score'] = data[available_lifestyle].mean(axis=1)
-            self.created_features.append('lifestyle_score')
-            
+            plan.append(('lifestyle_score', available_lifestyle,
+                         lambda d, cols=available_lifestyle: _row_mean(*[d[c] for c in cols])))
+        
         environment_columns = ['humidity', 'air_conditioner_use']
-        available_environment = [col for col in environment_columns if col in data.columns]
+        available_environment = [col for col in environment_columns if col in columns]
         
         if len(available_environment) >= 1:
-            data_enhanced['environment_risk'] = data[available_environment].mean(axis=1)
-            self.created_features.append('environment_risk')
-            
-        return data_enhanced
+            plan.append(('environment_risk', available_environment,
+                         lambda d, cols=available_environment: _row_mean(*[d[c] for c in cols])))
+        
+        return plan
     
-    def create_categorical_features(self, data):
-        data_enhanced = data.copy()
+    def _categorical_plan(self, columns):
+        plan = []
         
-        if 'age' in data.columns:
-            data_enhanced['age_group'] = data['age'].apply(calculate_age_group)
-            data_enhanced = pd.get_dummies(data_enhanced, columns=['age_group'], prefix='age')
-            
-        if 'screen_time' in data.columns:
-            data_enhanced['high_screen_time'] = (data['screen_time'] > 8).astype(int)
-            self.created_features.append('high_screen_time')
-            
-        if 'blink_frequency' in data.columns:
-            data_enhanced['low_blink_frequency'] = (data['blink_frequency'] < 15).astype(int)
-            self.created_features.append('low_blink_frequency')
-            
-        return data_enhanced
+        if 'age' in columns:
+            for label in sorted(AGE_GROUP_LABELS):
+                plan.append((f'age_{label}', ['age'],
+                             lambda d, code=AGE_GROUP_LABELS.index(label):
+                                 np.digitize(d['age'], AGE_GROUP_BINS) == code))
+        
+        if 'screen_time' in columns:
+            plan.append(('high_screen_time', ['screen_time'], lambda d: d['screen_time'] > 8))
+        
+        if 'blink_frequency' in columns:
+            plan.append(('low_blink_frequency', ['blink_frequency'], lambda d: d['blink_frequency'] < 15))
+        
+        return plan
     
-    def create_polynomial_features(self, data, degree=2):
-        data_enhanced = data.copy()
+    def _polynomial_plan(self, data, degree=2):
         numeric_columns = data.select_dtypes(include=[np.number]).columns[:3]
-        
-        for col in numeric_columns:
-            if col in data.columns:
-                data_enhanced[f'{col}_squared'] = data[col] ** degree
-                self.created_features.append(f'{col}_squared')
-                
-        return data_enhanced
+        return [
+            (f'{col}_squared', [col], lambda d, col=col: d[col] ** degree)
+            for col in numeric_columns
+        ]
     
-    def engineer_features(self, data, create_interactions=True, create_composite=True, 
-                         create_categorical=True, create_polynomial=False):
-        engineered_data = data.copy()
+    def build_feature_plan(self, data, create_interactions=True, create_composite=True,
+                           create_categorical=True, create_polynomial=False):
+        plan = []
         
         if create_interactions:
-            engineered_data = self.create_interaction_features(engineered_data)
+            plan.extend(self._interaction_plan(data.columns))
         if create_composite:
-            engineered_data = self.create_composite_features(engineered_data)
+            plan.extend(self._composite_plan(data.columns))
         if create_categorical:
-            engineered_data = self.create_categorical_features(engineered_data)
+            plan.extend(self._categorical_plan(data.columns))
         if create_polynomial:
-            engineered_data = self.create_polynomial_features(engineered_data)
+            plan.extend(self._polynomial_plan(data))
+        
+        return plan
+    
+    def apply_feature_plan(self, data, plan):
+        names = [name for name, _, _ in plan]
+        self.created_features = names
+        base = data.drop(columns=[name for name in names if name in data.columns])
+        if not plan:
+            return base.copy()
+        
+        inputs = {column for _, columns, _ in plan for column in columns}
+        values = {column: data[column].to_numpy(dtype=np.float64) for column in inputs}
+        
+        features = np.empty((len(data), len(plan)), dtype=np.float64)
+        for j, (_, _, compute) in enumerate(plan):
+            features[:, j] = compute(values)
+        
+        return pd.concat([base, pd.DataFrame(features, columns=names, index=data.index)], axis=1)
+    
+    def create_interaction_features(self, data):
+        return self.apply_feature_plan(data, self._interaction_plan(data.columns))
+    
+    def create_composite_features(self, data):
+        return self.apply_feature_plan(data, self._composite_plan(data.columns))
+    
+    def create_categorical_features(self, data):
+        return self.apply_feature_plan(data, self._categorical_plan(data.columns))
+    
+    def create_polynomial_features(self, data, degree=2):
+        return self.apply_feature_plan(data, self._polynomial_plan(data, degree))
+    
+    def engineer_features(self, data, create_interactions=True, create_composite=True,
+                         create_categorical=True, create_polynomial=False):
+        if self.is_fitted:
+            return self.transform(data)
+        
+        plan = self.build_feature_plan(data, create_interactions, create_composite,
+                                       create_categorical, create_polynomial)
+        return self.apply_feature_plan(data, plan)
+    
+    def fit(self, data, create_interactions=True, create_composite=True,
+            create_categorical=True, create_polynomial=False, dtype=np.float64,
+            output_features=None):
+        self.plan_options = {
+            'create_interactions': create_interactions,
+            'create_composite': create_composite,
+            'create_categorical': create_categorical,
+            'create_polynomial': create_polynomial
+        }
+        self.full_plan = self.build_feature_plan(data, **self.plan_options)
+        self.created_features = [name for name, _, _ in self.full_plan]
+        
+        self.input_columns = [c for c in data.columns if c not in self.created_features]
+        self.input_dtypes = {c: str(data[c].dtype) for c in self.input_columns}
+        self.output_dtype = np.dtype(dtype)
+        self.is_fitted = True
+        return self.select_outputs(output_features)
+    
+    def select_outputs(self, output_features=None):
+        if not self.is_fitted:
+            raise ValueError("FeatureEngineer not fitted")
+        
+        if output_features is None:
+            self.feature_plan = self.full_plan
+            self.required_inputs = self.input_columns
+            self.output_features = None
+            self.feature_names = self.input_columns + self.created_features
+        else:
+            plan_by_name = {entry[0]: entry for entry in self.full_plan}
+            unknown = [f for f in output_features if f not in plan_by_name and f not in self.input_columns]
+            if unknown:
+                raise ValueError(f"Unknown features requested: {unknown}")
+            
+            needed = set()
+            pending = list(output_features)
+            while pending:
+                name = pending.pop()
+                if name not in needed:
+                    needed.add(name)
+                    if name in plan_by_name:
+                        pending.extend(plan_by_name[name][1])
             
-        return engineered_data
+            self.feature_plan = [entry for entry in self.full_plan if entry[0] in needed]
+            self.required_inputs = [c for c in self.input_columns if c in needed]
+            self.output_features = list(output_features)
+            self.feature_names = list(output_features)
+        
+        self.feature_dtypes = {name: self.output_dtype.name for name in self.feature_names}
+        return self
+    
+    def transform(self, data, out=None):
+        if not self.is_fitted:
+            raise ValueError("FeatureEngineer not fitted")
+        
+        shape = (len(data), len(self.feature_names))
+        if out is None:
+            out = np.empty(shape, dtype=self.output_dtype)
+        elif out.shape != shape:
+            raise ValueError(f"Output buffer has shape {out.shape}, expected {shape}")
+        
+        values = {}
+        for column in self.required_inputs:
+            if column in data.columns:
+                values[column] = data[column].to_numpy(dtype=np.float64)
+            else:
+                values[column] = np.full(len(data), np.nan)
+        
+        for name, _, compute in self.feature_plan:
+            values[name] = compute(values)
+        
+        for j, name in enumerate(self.feature_names):
+            out[:, j] = values[name]
+        
+        return pd.DataFrame(out, columns=self.feature_names, index=data.index, copy=False)
+    
+    def fit_transform(self, data, **kwargs):
+        return self.fit(data, **kwargs).transform(data)
+    
+    def get_state(self):
+        if not self.is_fitted:
+            return None
+        return {
+            'plan_options': self.plan_options,
+            'input_dtypes': self.input_dtypes,
+            'input_columns': self.input_columns,
+            'output_dtype': self.output_dtype.name,
+            'output_features': self.output_features
+        }
+    
+    def set_state(self, state):
+        template = pd.DataFrame({
+            column: pd.Series(dtype=state['input_dtypes'][column]) for column in state['input_columns']
+        })
+        return self.fit(template, dtype=state['output_dtype'], output_features=state['output_features'],
+                        **state['plan_options'])
+    
+    def save_state(self, path=None):
+        if path is None:
+            path = os.path.join(MODELS_DIR, 'feature_engineer.pkl')
+        if self.is_fitted:
+            joblib.dump(self.get_state(), path)
+    
+    def load_state(self, path=None):
+        if path is None:
+            path = os.path.join(MODELS_DIR, 'feature_engineer.pkl')
+        if os.path.exists(path):
+            self.set_state(joblib.load(path))
     
     def get_created_features(self):
         return self.created_features
\ No newline at end of file
@@ -1,18 +1,51 @@
 from sklearn.feature_selection import SelectKBest, f_classif, RFE
 from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import train_test_split, StratifiedKFold
+from sklearn.metrics import get_scorer
+from joblib import Parallel, delayed, effective_n_jobs
+import xgboost as xgb
 import pandas as pd
 import numpy as np
+import numbers
+import json
+import os
+from src.utils.helpers import create_directories, get_data_fingerprint
 from config.model_config import FEATURE_SELECTION_PARAMS
-from config.settings import FEATURE_IMPORTANCE_THRESHOLD
+from config.settings import FEATURE_IMPORTANCE_THRESHOLD, RANDOM_STATE, CHUNK_SIZE
+
+def _fit_xgboost_fold(X, y, train_index, test_index, params, scoring):
+    model = xgb.XGBClassifier(**params)
+    model.fit(X.iloc[train_index], y[train_index])
+    score = get_scorer(scoring)(model, X.iloc[test_index], y[test_index])
+    return score, model.feature_importances_
 
 class FeatureSelector:
     def __init__(self):
         self.selected_features = []
         self.feature_importance = {}
         self.selector = None
+        self.elimination_curve = []
+        
+    def select_by_importance(self, X, y, model, threshold=FEATURE_IMPORTANCE_THRESHOLD,
+                             sample_size=None, cache_dir=None):
+        cache_path = None
+        if cache_dir and hasattr(X, 'columns'):
+            fingerprint = get_data_fingerprint(X, y, {
+                'model': type(model).__name__,
+                'params': model.get_params() if hasattr(model, 'get_params') else None,
+                'threshold': threshold,
+                'sample_size': sample_size
+            })
+            cache_path = os.path.join(cache_dir, f'feature_selection_{fingerprint}.json')
+            if os.path.exists(cache_path):
+                with open(cache_path, 'r') as f:
+                    cached = json.load(f)
+                self.feature_importance = cached['feature_importance']
+                self.selected_features = cached['selected_features']
+                return X[self.selected_features]
         
-    def select_by_importance(self, X, y, model, threshold=FEATURE_IMPORTANCE_THRESHOLD):
-        model.fit(X, y)
+        X_fit, y_fit = self._stratified_subsample(X, y, sample_size)
+        model.fit(X_fit, y_fit)
         
         if hasattr(model, 'feature_importances_'):
             importances = model.feature_importances_
@@ -27,10 +60,32 @@ class FeatureSelector:
         selected_mask = importances >= threshold
         self.selected_features = [feat for feat, mask in zip(feature_names, selected_mask) if mask]
         
+        if cache_path:
+            create_directories([cache_dir])
+            with open(cache_path, 'w') as f:
+                json.dump({
+                    'selected_features': self.selected_features,
+                    'feature_importance': {str(k): float(v) for k, v in self.feature_importance.items()}
+                }, f)
+        
         if hasattr(X, 'columns'):
             return X[self.selected_features]
         return X[:, selected_mask]
     
+    def _stratified_subsample(self, X, y, sample_size=None):
+        if sample_size is None:
+            return X, y
+        if isinstance(sample_size, numbers.Integral):
+            if sample_size >= len(X):
+                return X, y
+            sample_size = int(sample_size)
+        elif sample_size >= 1.0:
+            return X, y
+        X_sample, _, y_sample, _ = train_test_split(
+            X, y, train_size=sample_size, random_state=RANDOM_STATE, stratify=y
+        )
+        return X_sample, y_sample
+    
     def select_k_best(self, X, y, k=15, score_func=f_classif):
         self.selector = SelectKBest(score_func=score_func, k=k)
         X_selected = self.selector.fit_transform(X, y)
@@ -56,20 +111,133 @@ class FeatureSelector:
             
         return X_selected
     
-    def correlation_filter(self, X, threshold=0.95):
+    def xgboost_feature_elimination(self, X, y, n_features=10, step=0.2, cv=3, scoring='roc_auc',
+                                    sample_size=None, n_jobs=-1, xgb_params=None):
+        X_fit, y_fit = self._stratified_subsample(X, y, sample_size)
+        y_fit = np.asarray(y_fit)
+        folds = list(StratifiedKFold(n_splits=cv, shuffle=True, random_state=RANDOM_STATE).split(X_fit, y_fit))
+        
+        n_workers = min(effective_n_jobs(n_jobs), cv)
+        params = {
+            'tree_method': 'hist',
+            'n_estimators': 100,
+            'max_depth': 6,
+            'learning_rate': 0.1,
+            'random_state': RANDOM_STATE,
+            'n_jobs': max(1, (os.cpu_count() or 1) // n_workers)
+        }
+        params.update(xgb_params or {})
+        
+        features = list(X.columns)
+        self.elimination_curve = []
+        with Parallel(n_jobs=n_workers, prefer='threads') as parallel:
+            while True:
+                results = parallel(
+                    delayed(_fit_xgboost_fold)(X_fit[features], y_fit, train_index, test_index, params, scoring)
+                    for train_index, test_index in folds
+                )
+                scores = np.array([score for score, _ in results])
+                importances = np.mean([importance for _, importance in results], axis=0)
+                self.elimination_curve.append({
+                    'n_features': len(features),
+                    'score': float(scores.mean()),
+                    'score_std': float(scores.std()),
+                    'features': list(features)
+                })
+                
+                if len(features) <= n_features:
+                    break
+                
+                n_drop = int(step) if step >= 1 else max(1, int(len(features) * step))
+                n_drop = min(n_drop, len(features) - n_features)
+                dropped = {features[i] for i in np.argsort(importances, kind='stable')[:n_drop]}
+                features = [f for f in features if f not in dropped]
+        
+        self.feature_importance = dict(zip(features, importances))
+        self.selected_features = features
+        return X[self.selected_features]
+    
+    def get_elimination_curve(self):
+        return [(point['n_features'], point['score']) for point in self.elimination_curve]
+    
+    def correlation_filter(self, X, threshold=0.95, block_size=256, chunksize=CHUNK_SIZE):
         if not hasattr(X, 'corr'):
             return X
             
-        corr_matrix = X.corr().abs()
-        upper_triangle = corr_matrix.where(
-            np.triu(np.ones(corr_matrix.shape), k=1).astype(bool)
+        columns = list(X.columns)
+        Z = X.to_numpy(dtype=np.float32, copy=True)
+        mean = np.nanmean(Z, axis=0, dtype=np.float64)
+        std = np.nanstd(Z, axis=0, dtype=np.float64)
+        Z -= mean.astype(np.float32)
+        Z /= np.where(std > 0, std, 1.0).astype(np.float32)
+        np.nan_to_num(Z, copy=False)
+        
+        kept = self._greedy_correlation_prune(
+            lambda: (Z[start:start + chunksize] for start in range(0, len(Z), chunksize)),
+            len(columns), threshold, block_size
         )
+        self.selected_features = [columns[i] for i in kept]
+        return X[self.selected_features]
         
-        high_corr_features = [column for column in upper_triangle.columns 
-                            if any(upper_triangle[column] > threshold)]
+    def correlation_filter_chunked(self, chunk_source, threshold=0.95, block_size=256):
+        columns = None
+        counts = sums = squares = None
+        for chunk in chunk_source():
+            values = chunk.to_numpy(dtype=np.float64)
+            if columns is None:
+                columns = list(chunk.columns)
+                counts = np.zeros(len(columns))
+                sums = np.zeros(len(columns))
+                squares = np.zeros(len(columns))
+            counts += (~np.isnan(values)).sum(axis=0)
+            sums += np.nansum(values, axis=0)
+            squares += np.nansum(values ** 2, axis=0)
         
-        self.selected_features = [col for col in X.columns if col not in high_corr_features]
-        return X[self.selected_features]
+        if columns is None:
+            return []
+        
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = sums / counts
+            std = np.sqrt(np.maximum(squares / counts - mean ** 2, 0))
+        mean = np.nan_to_num(mean).astype(np.float32)
+        scale = np.where(std > 0, std, 1.0).astype(np.float32)
+        
+        def standardized_chunks():
+            for chunk in chunk_source():
+                Z = (chunk[columns].to_numpy(dtype=np.float32) - mean) / scale
+                yield np.nan_to_num(Z, copy=False)
+        
+        kept = self._greedy_correlation_prune(standardized_chunks, len(columns), threshold, block_size)
+        self.selected_features = [columns[i] for i in kept]
+        return self.selected_features
+    
+    def _greedy_correlation_prune(self, standardized_chunks, n_columns, threshold, block_size):
+        kept = []
+        
+        for start in range(0, n_columns, block_size):
+            block = np.arange(start, min(start + block_size, n_columns))
+            kept_index = np.asarray(kept, dtype=np.intp)
+            
+            gram = np.zeros((len(kept_index) + len(block), len(block)), dtype=np.float64)
+            n_rows = 0
+            for Z in standardized_chunks():
+                Z_block = Z[:, block]
+                for tile in range(0, len(kept_index), block_size):
+                    tile_index = kept_index[tile:tile + block_size]
+                    gram[tile:tile + len(tile_index)] += Z[:, tile_index].T @ Z_block
+                gram[len(kept_index):] += Z_block.T @ Z_block
+                n_rows += len(Z)
+            corr = np.abs(gram / max(n_rows, 1))
+            
+            n_kept = len(kept)
+            alive = ~(corr[:n_kept] > threshold).any(axis=0)
+            within = corr[n_kept:]
+            for j in range(len(block)):
+                if alive[j]:
+                    kept.append(block[j])
+                    alive[j + 1:] &= within[j, j + 1:] <= threshold
+        
+        return kept
     
     def variance_filter(self, X, threshold=0.01):
         if hasattr(X, 'var'):
@@ -81,10 +249,14 @@ class FeatureSelector:
     
     def select_features(self, X, y, method='importance', **kwargs):
         if method == 'importance':
-            from sklearn.ensemble import RandomForestClassifier
-            model = kwargs.get('model', RandomForestClassifier(n_estimators=50, random_state=42))
+            model = kwargs.get('model', RandomForestClassifier(
+                n_estimators=FEATURE_SELECTION_PARAMS['n_estimators'],
+                n_jobs=FEATURE_SELECTION_PARAMS['n_jobs'],
+                random_state=RANDOM_STATE
+            ))
             threshold = kwargs.get('threshold', FEATURE_IMPORTANCE_THRESHOLD)
-            return self.select_by_importance(X, y, model, threshold)
+            sample_size = kwargs.get('sample_size', FEATURE_SELECTION_PARAMS['sample_size'])
+            return self.select_by_importance(X, y, model, threshold, sample_size, kwargs.get('cache_dir'))
         elif method == 'k_best':
             k = kwargs.get('k', FEATURE_SELECTION_PARAMS['k_best'])
             return self.select_k_best(X, y, k)
@@ -92,9 +264,21 @@ class FeatureSelector:
             n_features = kwargs.get('n_features', 10)
             estimator = kwargs.get('estimator', None)
             return self.recursive_feature_elimination(X, y, estimator, n_features)
+        elif method == 'xgb_rfe':
+            return self.xgboost_feature_elimination(
+                X, y,
+                n_features=kwargs.get('n_features', 10),
+                step=kwargs.get('step', 0.2),
+                cv=kwargs.get('cv', 3),
+                scoring=kwargs.get('scoring', 'roc_auc'),
+                sample_size=kwargs.get('sample_size', FEATURE_SELECTION_PARAMS['sample_size']),
+                n_jobs=kwargs.get('n_jobs', FEATURE_SELECTION_PARAMS['n_jobs']),
+                xgb_params=kwargs.get('xgb_params')
+            )
         elif method == 'correlation':
             threshold = kwargs.get('threshold', 0.95)
-            return self.correlation_filter(X, threshold)
+            block_size = kwargs.get('block_size', 256)
+            return self.correlation_filter(X, threshold, block_size)
         elif method == 'variance':
             threshold = kwargs.get('threshold', 0.01)
             return self.variance_filter(X, threshold)
@@ -107,6 +291,17 @@ class FeatureSelector:
     def get_feature_importance(self):
         return self.feature_importance
     
+    def get_state(self):
+        return {
+            'selected_features': self.selected_features,
+            'feature_importance': self.feature_importance
+        }
+    
+    def set_state(self, state):
+        self.selected_features = state['selected_features']
+        self.feature_importance = state['feature_importance']
+        return self
+    
     def transform(self, X):
         if self.selected_features and hasattr(X, 'columns'):
             return X[self.selected_features]
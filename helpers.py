@@ -1,6 +1,9 @@
 import pandas as pd
 import numpy as np
 import os
+import json
+import shutil
+import hashlib
 from datetime import datetime
 
 def create_directories(paths):
@@ -13,6 +16,64 @@ def load_csv_data(filepath):
 def save_csv_data(data, filepath):
     data.to_csv(filepath, index=False)
 
+def get_file_fingerprint(filepaths, extra=None):
+    if isinstance(filepaths, str):
+        filepaths = [filepaths]
+    
+    parts = []
+    for filepath in filepaths:
+        stat = os.stat(filepath)
+        parts.append(f"{os.path.abspath(filepath)}:{stat.st_size}:{stat.st_mtime_ns}")
+    key = '|'.join(parts) + f":{json.dumps(extra, sort_keys=True)}"
+    return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+def get_data_fingerprint(X, y=None, extra=None):
+    digest = hashlib.sha1()
+    digest.update(json.dumps([str(c) for c in X.columns]).encode())
+    digest.update(pd.util.hash_pandas_object(X, index=False).to_numpy().tobytes())
+    if y is not None:
+        digest.update(pd.util.hash_pandas_object(pd.Series(np.asarray(y)), index=False).to_numpy().tobytes())
+    digest.update(json.dumps(extra, sort_keys=True, default=str).encode())
+    return digest.hexdigest()[:16]
+
+def save_npy_columns(data, directory, metadata=None):
+    tmp_directory = directory + '.tmp'
+    shutil.rmtree(tmp_directory, ignore_errors=True)
+    os.makedirs(tmp_directory)
+    
+    columns = []
+    for i, column in enumerate(data.columns):
+        values = data[column]
+        entry = {'name': column, 'file': f'{i}.npy'}
+        if isinstance(values.dtype, pd.CategoricalDtype) or values.dtype == object:
+            values = values.astype('category')
+            entry['categories'] = values.cat.categories.tolist()
+            array = values.cat.codes.to_numpy()
+        else:
+            array = values.to_numpy()
+        np.save(os.path.join(tmp_directory, entry['file']), array)
+        columns.append(entry)
+    
+    meta = dict(metadata or {}, rows=len(data), columns=columns)
+    with open(os.path.join(tmp_directory, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+    
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp_directory, directory)
+
+def load_npy_columns(directory, mmap_mode='r'):
+    with open(os.path.join(directory, 'meta.json'), 'r') as f:
+        meta = json.load(f)
+    
+    arrays = {}
+    for entry in meta['columns']:
+        array = np.load(os.path.join(directory, entry['file']), mmap_mode=mmap_mode)
+        if 'categories' in entry:
+            array = pd.Categorical.from_codes(array, entry['categories'])
+        arrays[entry['name']] = array
+    
+    return pd.DataFrame(arrays, copy=False), meta
+
 def get_timestamp():
     return datetime.now().strftime("%Y%m%d_%H%M%S")
 
@@ -48,4 +109,52 @@ def get_risk_category(probability):
     for (lower, upper), category in [(0, 0.3, 'Low Risk'), (0.3, 0.6, 'Medium Risk'), (0.6, 1.0, 'High Risk')]:
         if lower <= probability < upper:
             return category
-    return 'High Risk'
\ No newline at end of file
+    return 'High Risk'
+
+class QuantileSketch:
+    def __init__(self, capacity=10000):
+        self.capacity = capacity
+        self.values = np.empty(0)
+        self.weights = np.empty(0)
+    
+    def update(self, values, weight=1.0):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if len(values) == 0 or weight <= 0:
+            return self
+        
+        self.values = np.concatenate([self.values, values])
+        self.weights = np.concatenate([self.weights, np.full(len(values), float(weight))])
+        if len(self.values) > 2 * self.capacity:
+            self._compress()
+        return self
+    
+    def merge(self, other):
+        self.values = np.concatenate([self.values, other.values])
+        self.weights = np.concatenate([self.weights, other.weights])
+        if len(self.values) > 2 * self.capacity:
+            self._compress()
+        return self
+    
+    def _compress(self):
+        order = np.argsort(self.values, kind='mergesort')
+        values = self.values[order]
+        cumulative = np.cumsum(self.weights[order])
+        total = cumulative[-1]
+        
+        targets = (np.arange(self.capacity) + 0.5) * total / self.capacity
+        self.values = values[np.searchsorted(cumulative, targets)]
+        self.weights = np.full(self.capacity, total / self.capacity)
+    
+    def quantile(self, q):
+        if len(self.values) == 0:
+            return np.nan
+        
+        order = np.argsort(self.values, kind='mergesort')
+        values = self.values[order]
+        weights = self.weights[order]
+        ends = np.cumsum(weights) - 1
+        starts = ends - weights + 1
+        
+        positions = np.column_stack([starts, np.maximum(ends, starts)]).ravel()
+        return np.interp(np.asarray(q) * ends[-1], positions, np.repeat(values, 2))
\ No newline at end of file
@@ -0,0 +1,110 @@
+import pandas as pd
+import joblib
+import time
+import os
+from src.data_processing.data_loader import apply_dtypes
+from src.data_processing.data_cleaner import DataCleaner
+from src.data_processing.feature_engineer import FeatureEngineer
+from src.modeling.feature_selector import FeatureSelector
+from src.modeling.xgboost_predictor import XGBoostPredictor
+from src.utils.helpers import get_timestamp
+from config.settings import MODELS_DIR, RISK_THRESHOLD
+
+PIPELINE_VERSION = 3
+
+class InferencePipeline:
+    def __init__(self, data_cleaner=None, feature_engineer=None, feature_selector=None, predictor=None,
+                 input_columns=None, input_dtypes=None):
+        self.data_cleaner = data_cleaner or DataCleaner()
+        self.feature_engineer = feature_engineer or FeatureEngineer()
+        self.feature_selector = feature_selector or FeatureSelector()
+        self.predictor = predictor or XGBoostPredictor()
+        self.input_columns = list(input_columns) if input_columns is not None else None
+        self.input_dtypes = dict(input_dtypes) if input_dtypes is not None else None
+        self.metadata = {}
+        self.stages = None
+        self.is_loaded = False
+    
+    def compile(self):
+        stages = []
+        input_dtypes = self.get_input_dtypes() or {}
+        input_columns = self.input_columns or list(input_dtypes)
+        if input_columns:
+            stages.append(('align', lambda d: apply_dtypes(d.reindex(columns=input_columns), input_dtypes)))
+        else:
+            stages.append(('align', lambda d: apply_dtypes(d.copy(), input_dtypes)))
+        stages.append(('clean', lambda d: self.data_cleaner.clean_pipeline(
+            d, remove_duplicates=False, inplace=True, fit=False)))
+        
+        if self.feature_engineer.is_fitted:
+            stages.append(('engineer', self.feature_engineer.transform))
+        else:
+            stages.append(('engineer', self.feature_engineer.engineer_features))
+        
+        selected_features = self.feature_selector.get_selected_features()
+        if selected_features and selected_features != self.feature_engineer.feature_names:
+            stages.append(('select', self.feature_selector.transform))
+        
+        self.stages = stages
+        return self
+    
+    def get_input_dtypes(self):
+        return self.input_dtypes or self.data_cleaner.input_dtypes
+    
+    def transform(self, data):
+        if isinstance(data, dict):
+            data = pd.DataFrame([data])
+        if self.stages is None:
+            self.compile()
+        
+        for _, stage in self.stages:
+            data = stage(data)
+        return data
+    
+    def predict(self, data, threshold=RISK_THRESHOLD):
+        X = self.transform(data)
+        return dict(self.predictor.score(X, threshold), features=X)
+    
+    def get_state(self):
+        return {
+            'version': PIPELINE_VERSION,
+            'created_at': get_timestamp(),
+            'input_columns': self.input_columns,
+            'input_dtypes': self.get_input_dtypes(),
+            'data_cleaner': self.data_cleaner.get_state(),
+            'feature_engineer': self.feature_engineer.get_state(),
+            'feature_selector': self.feature_selector.get_state(),
+            'predictor': self.predictor.get_state()
+        }
+    
+    def set_state(self, state):
+        version = state.get('version')
+        if version != PIPELINE_VERSION:
+            raise ValueError(f"Unsupported inference pipeline version {version}, expected {PIPELINE_VERSION}")
+        
+        self.input_columns = state['input_columns']
+        self.input_dtypes = state['input_dtypes']
+        self.data_cleaner.set_state(state['data_cleaner'])
+        if state['feature_engineer'] is not None:
+            self.feature_engineer.set_state(state['feature_engineer'])
+        self.feature_selector.set_state(state['feature_selector'])
+        self.predictor.set_state(state['predictor'])
+        self.metadata = {'version': version, 'created_at': state['created_at']}
+        return self.compile()
+    
+    def save(self, path=None):
+        if path is None:
+            path = os.path.join(MODELS_DIR, 'inference_pipeline.pkl')
+        joblib.dump(self.get_state(), path)
+        return path
+    
+    def load(self, path=None):
+        if path is None:
+            path = os.path.join(MODELS_DIR, 'inference_pipeline.pkl')
+        if os.path.exists(path):
+            start = time.perf_counter()
+            self.set_state(joblib.load(path))
+            self.metadata['load_seconds'] = time.perf_counter() - start
+            self.metadata['path'] = path
+            self.is_loaded = True
+        return self
\ No newline at end of file
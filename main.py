@@ -6,6 +6,7 @@ from src.data_processing.data_loader import DataLoader
 from src.data_processing.data_cleaner import DataCleaner
 from src.data_processing.feature_engineer import FeatureEngineer
 from src.modeling.xgboost_predictor import XGBoostPredictor
+from src.modeling.inference_pipeline import InferencePipeline
 from src.analysis.risk_assessor import RiskAssessor
 from src.analysis.severity_classifier import SeverityClassifier
 from src.analysis.factor_analyzer import FactorAnalyzer
@@ -23,13 +24,23 @@ class DryEyePredictionSystem:
         self.predictor = XGBoostPredictor()
         self.risk_assessor = RiskAssessor(self.predictor)
         self.severity_classifier = SeverityClassifier(self.predictor)
+        self.pipeline = InferencePipeline(self.data_cleaner, self.feature_engineer, predictor=self.predictor)
         self.factor_analyzer = FactorAnalyzer()
         self.recommendation_generator = RecommendationGenerator()
         self.personalization = Personalization()
         self.report_generator = ReportGenerator()
         
     def load_models(self):
+        if self.pipeline.load().is_loaded:
+            return
+        
         self.predictor.load_models()
+        self.data_cleaner.load_state()
+        self.feature_engineer.load_state()
+        if self.feature_engineer.is_fitted and self.feature_engineer.output_features is None \
+                and self.predictor.feature_names:
+            self.feature_engineer.select_outputs(self.predictor.feature_names)
+        self.pipeline.compile()
         
     def predict_for_patient(self, patient_data):
         if isinstance(patient_data, dict):
@@ -37,11 +48,11 @@ class DryEyePredictionSystem:
         else:
             patient_df = patient_data
             
-        cleaned_data = self.data_cleaner.clean_pipeline(patient_df)
-        engineered_data = self.feature_engineer.engineer_features(cleaned_data)
+        engineered_data = self.pipeline.transform(patient_df)
         
-        risk_assessment = self.risk_assessor.assess_individual_risk(engineered_data)
-        severity_assessment = self.severity_classifier.classify_severity(engineered_data)
+        scores = self.predictor.score(engineered_data)
+        risk_assessment = self.risk_assessor.assess_individual_risk(engineered_data, scores)
+        severity_assessment = self.severity_classifier.classify_severity(engineered_data, scores)
         
         feature_importance = self.predictor.get_feature_importance('risk')
         if feature_importance:
@@ -20,10 +20,31 @@ XGBOOST_SEVERITY_PARAMS = {
     'num_class': 4
 }
 
+EARLY_STOPPING_PARAMS = {
+    'tree_method': 'hist',
+    'early_stopping_rounds': 20
+}
+
 FEATURE_SELECTION_PARAMS = {
     'method': 'importance',
     'threshold': 0.01,
-    'k_best': 15
+    'k_best': 15,
+    'n_estimators': 50,
+    'n_jobs': -1,
+    'sample_size': None
+}
+
+CV_ENGINE_PARAMS = {
+    'max_bin': 256,
+    'n_jobs': -1,
+    'fold_jobs': None
+}
+
+SERVING_PARAMS = {
+    'pool_size': 4,
+    'thread_budget': None,
+    'rows_per_thread': 1024,
+    'checkout_timeout': 30
 }
 
 PREPROCESSING_PARAMS = {
@@ -2,7 +2,9 @@ from sklearn.model_selection import train_test_split, cross_val_score, GridSearc
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score
 import numpy as np
 from src.modeling.xgboost_predictor import XGBoostPredictor
-from config.settings import TEST_SIZE, RANDOM_STATE, CV_FOLDS
+from src.modeling.cv_engine import CrossValidationEngine
+from config.model_config import XGBOOST_PARAMS, XGBOOST_SEVERITY_PARAMS
+from config.settings import TEST_SIZE, RANDOM_STATE, CV_FOLDS, CHUNK_SIZE
 
 class ModelTrainer:
     def __init__(self):
@@ -14,39 +16,106 @@ class ModelTrainer:
         return train_test_split(X, y, test_size=test_size, 
                               random_state=RANDOM_STATE, stratify=stratify_param)
     
-    def train_risk_model(self, X, y, validation_split=0.2):
+    def train_risk_model(self, X, y, validation_split=0.2, early_stopping=False):
         X_train_full, X_test, y_train_full, y_test = self.split_data(X, y)
         
         if validation_split > 0:
             X_train, X_val, y_train, y_val = self.split_data(
                 X_train_full, y_train_full, test_size=validation_split
             )
-            self.predictor.train_risk_model(X_train, y_train, X_val, y_val)
+            self.predictor.train_risk_model(X_train, y_train, X_val, y_val, early_stopping)
         else:
             self.predictor.train_risk_model(X_train_full, y_train_full)
             
         self._evaluate_model(X_test, y_test, 'risk')
         return X_test, y_test
     
-    def train_severity_model(self, X, y, validation_split=0.2):
+    def train_severity_model(self, X, y, validation_split=0.2, early_stopping=False):
         X_train_full, X_test, y_train_full, y_test = self.split_data(X, y)
         
         if validation_split > 0:
             X_train, X_val, y_train, y_val = self.split_data(
                 X_train_full, y_train_full, test_size=validation_split
             )
-            self.predictor.train_severity_model(X_train, y_train, X_val, y_val)
+            self.predictor.train_severity_model(X_train, y_train, X_val, y_val, early_stopping)
         else:
             self.predictor.train_severity_model(X_train_full, y_train_full)
             
         self._evaluate_model(X_test, y_test, 'severity')
         return X_test, y_test
     
+    def iter_training_chunks(self, data_loader, data_cleaner, feature_engineer=None, features=None,
+                             target_column='dry_eye_disease', chunksize=CHUNK_SIZE, validation_split=0.2,
+                             test_size=TEST_SIZE, subset='train'):
+        validation_end = test_size + (1 - test_size) * validation_split
+        for i, chunk in enumerate(data_loader.iter_chunks(chunksize, target_column)):
+            y = chunk.pop(target_column).to_numpy()
+            draw = np.random.default_rng(RANDOM_STATE + i).random(len(chunk))
+            if subset == 'test':
+                mask = draw < test_size
+            elif subset == 'validation':
+                mask = (draw >= test_size) & (draw < validation_end)
+            else:
+                mask = draw >= validation_end
+            
+            X = data_cleaner.clean_pipeline(chunk[mask], remove_duplicates=False, fit=False)
+            if feature_engineer is not None:
+                if not feature_engineer.is_fitted:
+                    feature_engineer.fit(X)
+                X = feature_engineer.transform(X)
+            if features:
+                X = X[features]
+            yield X, y[mask]
+    
+    def train_model_external(self, data_loader, data_cleaner, feature_engineer=None, features=None,
+                             model_type='risk', target_column='dry_eye_disease', chunksize=CHUNK_SIZE,
+                             validation_split=0.2, test_size=TEST_SIZE, cache_dir=None, early_stopping=True):
+        if not data_cleaner.fitted:
+            data_cleaner.fit_streaming(
+                chunk.drop(columns=[target_column]) for chunk in data_loader.iter_chunks(chunksize, target_column)
+            )
+        
+        def chunk_source(subset):
+            return lambda: self.iter_training_chunks(data_loader, data_cleaner, feature_engineer, features,
+                                                     target_column, chunksize, validation_split, test_size, subset)
+        
+        validation_source = chunk_source('validation') if validation_split > 0 else None
+        if model_type == 'risk':
+            self.predictor.train_risk_model_external(chunk_source('train'), validation_source, cache_dir,
+                                                     early_stopping=early_stopping)
+        else:
+            self.predictor.train_severity_model_external(chunk_source('train'), validation_source, cache_dir,
+                                                         early_stopping=early_stopping)
+        
+        if test_size > 0:
+            self._evaluate_chunks(chunk_source('test')(), model_type)
+        return self.predictor
+    
+    def _evaluate_chunks(self, chunks, model_type='risk'):
+        y_true = []
+        scores = []
+        for X, y in chunks:
+            y_true.append(y)
+            scores.append(self.predictor.score(X, risk=model_type == 'risk', severity=model_type != 'risk'))
+        
+        y_true = np.concatenate(y_true)
+        if model_type == 'risk':
+            self._compute_metrics(y_true, np.concatenate([s['risk'] for s in scores]), 'risk',
+                                  np.concatenate([s['risk_probability'] for s in scores]))
+        else:
+            self._compute_metrics(y_true, np.concatenate([s['severity'] for s in scores]), 'severity')
+    
     def _evaluate_model(self, X_test, y_test, model_type='risk'):
         if model_type == 'risk':
             y_pred = self.predictor.predict_risk(X_test)
             y_pred_proba = self.predictor.predict_risk_probability(X_test)
+        else:
+            y_pred = self.predictor.predict_severity(X_test)
+            y_pred_proba = None
+        self._compute_metrics(y_test, y_pred, model_type, y_pred_proba)
             
+    def _compute_metrics(self, y_test, y_pred, model_type='risk', y_pred_proba=None):
+        if model_type == 'risk':
             metrics = {
                 'accuracy': accuracy_score(y_test, y_pred),
                 'precision': precision_score(y_test, y_pred),
@@ -55,7 +124,6 @@ class ModelTrainer:
                 'auc_roc': roc_auc_score(y_test, y_pred_proba)
             }
         else:
-            y_pred = self.predictor.predict_severity(X_test)
             metrics = {
                 'accuracy': accuracy_score(y_test, y_pred),
                 'precision': precision_score(y_test, y_pred, average='weighted'),
@@ -65,7 +133,13 @@ class ModelTrainer:
             
         self.metrics[model_type] = metrics
         
-    def cross_validate_model(self, X, y, model_type='risk', cv=CV_FOLDS):
+    def cross_validate_model(self, X, y, model_type='risk', cv=CV_FOLDS, parallel=False, n_jobs=None,
+                             fold_jobs=None, scoring='accuracy'):
+        if parallel:
+            params = XGBOOST_PARAMS if model_type == 'risk' else XGBOOST_SEVERITY_PARAMS
+            engine = CrossValidationEngine(params, n_folds=cv, n_jobs=n_jobs, fold_jobs=fold_jobs)
+            return engine.cross_validate(X, y, scoring)
+        
         if model_type == 'risk':
             model = self.predictor.risk_model
         else:
@@ -74,7 +148,7 @@ class ModelTrainer:
         if model is None:
             return None
             
-        cv_scores = cross_val_score(model, X, y, cv=cv, scoring='accuracy')
+        cv_scores = cross_val_score(model, X, y, cv=cv, scoring=scoring)
         return {
             'mean_score': cv_scores.mean(),
             'std_score': cv_scores.std(),
@@ -0,0 +1,84 @@
+import numpy as np
+import queue
+import time
+import os
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from src.modeling.xgboost_predictor import XGBoostPredictor
+from config.model_config import SERVING_PARAMS
+from config.settings import RISK_THRESHOLD
+
+class PredictorPool:
+    def __init__(self, predictor=None, pool_size=None, thread_budget=None, rows_per_thread=None,
+                 checkout_timeout=None):
+        self.pool_size = pool_size or SERVING_PARAMS['pool_size']
+        self.thread_budget = thread_budget or SERVING_PARAMS['thread_budget'] or os.cpu_count() or 1
+        self.rows_per_thread = rows_per_thread or SERVING_PARAMS['rows_per_thread']
+        self.checkout_timeout = checkout_timeout or SERVING_PARAMS['checkout_timeout']
+        self.max_threads = max(1, self.thread_budget // self.pool_size)
+        self.handles = queue.Queue(maxsize=self.pool_size)
+        
+        if predictor is None:
+            predictor = XGBoostPredictor()
+            predictor.load_models()
+        if predictor.risk_booster is None:
+            raise ValueError("Risk model not trained")
+        
+        state = predictor.get_state()
+        for _ in range(self.pool_size):
+            self.handles.put(XGBoostPredictor().set_state(state).set_nthread(1))
+    
+    def threads_for_batch(self, n_rows):
+        return int(min(self.max_threads, max(1, -(-n_rows // self.rows_per_thread))))
+    
+    @contextmanager
+    def checkout(self, timeout=None):
+        try:
+            handle = self.handles.get(timeout=timeout or self.checkout_timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No predictor handle available after {timeout or self.checkout_timeout}s")
+        try:
+            yield handle
+        finally:
+            self.handles.put(handle)
+    
+    def score(self, X, threshold=RISK_THRESHOLD, risk=True, severity=True):
+        with self.checkout() as predictor:
+            X = predictor._prepare_input(X)
+            predictor.set_nthread(self.threads_for_batch(len(X)))
+            return predictor.score(X, threshold, risk, severity)
+    
+    def predict_risk_probability(self, X):
+        return self.score(X, severity=False)['risk_probability']
+
+def benchmark_pool(predictor, X, pool_sizes=(1, 2, 4, 8), thread_budget=None, batch_size=1,
+                   n_requests=500, concurrency=None):
+    X = predictor._prepare_input(X)
+    rng = np.random.default_rng(0)
+    starts = rng.integers(0, max(len(X) - batch_size, 0) + 1, n_requests)
+    results = {}
+    
+    for pool_size in pool_sizes:
+        pool = PredictorPool(predictor, pool_size=pool_size, thread_budget=thread_budget)
+        workers = concurrency or pool_size
+        
+        def timed_request(start):
+            request_start = time.perf_counter()
+            pool.score(X[start:start + batch_size])
+            return time.perf_counter() - request_start
+        
+        wall_start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            latencies = np.array(list(executor.map(timed_request, starts)))
+        wall_seconds = time.perf_counter() - wall_start
+        
+        results[pool_size] = {
+            'threads_per_handle': pool.max_threads,
+            'workers': workers,
+            'requests_per_second': n_requests / wall_seconds,
+            'rows_per_second': n_requests * batch_size / wall_seconds,
+            'p50_ms': float(np.percentile(latencies, 50) * 1000),
+            'p99_ms': float(np.percentile(latencies, 99) * 1000)
+        }
+    
+    return results
\ No newline at end of file
@@ -9,17 +9,20 @@ class RiskAssessor:
         self.predictor = predictor
         self.risk_threshold = RISK_THRESHOLD
         
-    def assess_individual_risk(self, patient_data):
-        if self.predictor is None:
-            raise ValueError("Predictor model not initialized")
+    def assess_individual_risk(self, patient_data, scores=None):
+        if scores is None:
+            if self.predictor is None:
+                raise ValueError("Predictor model not initialized")
             
-        if isinstance(patient_data, dict):
-            patient_df = pd.DataFrame([patient_data])
-        else:
-            patient_df = patient_data
+            if isinstance(patient_data, dict):
+                patient_df = pd.DataFrame([patient_data])
+            else:
+                patient_df = patient_data
             
-        risk_probability = self.predictor.predict_risk_probability(patient_df)[0]
-        risk_binary = self.predictor.predict_risk(patient_df)[0]
+            scores = self.predictor.score(patient_df, self.risk_threshold, severity=False)
+        
+        risk_probability = scores['risk_probability'][0]
+        risk_binary = scores['risk'][0]
         risk_category = get_risk_category(risk_probability)
         
         return {
@@ -33,8 +36,9 @@ class RiskAssessor:
         if self.predictor is None:
             raise ValueError("Predictor model not initialized")
             
-        risk_probabilities = self.predictor.predict_risk_probability(population_data)
-        risk_predictions = self.predictor.predict_risk(population_data)
+        scores = self.predictor.score(population_data, self.risk_threshold, severity=False)
+        risk_probabilities = scores['risk_probability']
+        risk_predictions = scores['risk']
         
         risk_distribution = {}
         for prob in risk_probabilities:
@@ -7,17 +7,20 @@ class SeverityClassifier:
         self.predictor = predictor
         self.severity_levels = SEVERITY_LEVELS
         
-    def classify_severity(self, patient_data):
-        if self.predictor is None or self.predictor.severity_model is None:
-            return self._rule_based_classification(patient_data)
+    def classify_severity(self, patient_data, scores=None):
+        if scores is None or 'severity' not in scores:
+            if self.predictor is None or self.predictor.severity_booster is None:
+                return self._rule_based_classification(patient_data)
             
-        if isinstance(patient_data, dict):
-            patient_df = pd.DataFrame([patient_data])
-        else:
-            patient_df = patient_data
+            if isinstance(patient_data, dict):
+                patient_df = pd.DataFrame([patient_data])
+            else:
+                patient_df = patient_data
             
-        severity_prediction = self.predictor.predict_severity(patient_df)[0]
-        severity_probabilities = self.predictor.predict_severity_probability(patient_df)[0]
+            scores = self.predictor.score(patient_df, risk=False)
+        
+        severity_prediction = scores['severity'][0]
+        severity_probabilities = scores['severity_probability'][0]
         
         return {
             'severity_level': severity_prediction,
@@ -8,15 +8,17 @@ from src.data_processing.feature_engineer import FeatureEngineer
 from src.data_processing.data_validator import DataValidator
 from src.modeling.model_trainer import ModelTrainer
 from src.modeling.feature_selector import FeatureSelector
+from src.modeling.inference_pipeline import InferencePipeline
 from src.analysis.factor_analyzer import FactorAnalyzer
 from src.visualization.result_visualizer import ResultVisualizer
+from config.settings import CHUNK_SIZE, CACHE_DIR
 import pandas as pd
 import numpy as np
 
 def train_models():
     print("Starting model training pipeline...")
     
-    data_loader = DataLoader()
+    data_loader = DataLoader(use_cache=True)
     data_cleaner = DataCleaner()
     feature_engineer = FeatureEngineer()
     data_validator = DataValidator()
@@ -27,7 +29,7 @@ def train_models():
     
     print("Loading data...")
     try:
-        X, y = data_loader.get_features_and_target()
+        X, y = data_loader.get_features_and_target(chunksize=CHUNK_SIZE, compact=True)
         if X is None or y is None:
             print("Error: Could not load data. Please check data file path.")
             return
@@ -36,6 +38,9 @@ def train_models():
         return
         
     print(f"Data loaded: {X.shape[0]} samples, {X.shape[1]} features")
+    if data_loader.compaction_report:
+        print(f"Compacted dtypes: saved {data_loader.compaction_report['bytes_saved'] / 1e6:.1f} MB "
+              f"({data_loader.compaction_report['compression_ratio']:.1f}x smaller)")
     
     print("Validating data quality...")
     validation_results = data_validator.validate_all(X)
@@ -49,16 +54,18 @@ def train_models():
     print(f"Data after cleaning: {X_cleaned.shape}")
     
     print("Engineering features...")
-    X_engineered = feature_engineer.engineer_features(X_cleaned)
+    X_engineered = feature_engineer.fit_transform(X_cleaned)
     print(f"Data after feature engineering: {X_engineered.shape}")
     
     print("Selecting best features...")
-    X_selected = feature_selector.select_features(X_engineered, y, method='importance')
+    X_selected = feature_selector.select_features(X_engineered, y, method='importance', cache_dir=CACHE_DIR)
     selected_features = feature_selector.get_selected_features()
     print(f"Selected {len(selected_features)} features")
+    feature_engineer.select_outputs(selected_features)
     
     print("Training risk prediction model...")
-    X_test_risk, y_test_risk = model_trainer.train_risk_model(X_selected, y)
+    X_test_risk, y_test_risk = model_trainer.train_risk_model(X_selected, y, early_stopping=True)
+    print(f"Risk model best iteration: {model_trainer.predictor.get_best_iteration('risk')}")
     risk_metrics = model_trainer.get_metrics('risk')
     print("Risk model metrics:")
     for metric, value in risk_metrics.items():
@@ -71,7 +78,8 @@ def train_models():
     if len(np.unique(y)) > 2:
         print("Training severity classification model...")
         y_severity = np.random.randint(0, 4, len(y))
-        X_test_severity, y_test_severity = model_trainer.train_severity_model(X_selected, y_severity)
+        X_test_severity, y_test_severity = model_trainer.train_severity_model(X_selected, y_severity,
+                                                                              early_stopping=True)
         severity_metrics = model_trainer.get_metrics('severity')
         print("Severity model metrics:")
         for metric, value in severity_metrics.items():
@@ -79,6 +87,11 @@ def train_models():
     
     print("Saving models...")
     model_trainer.save_models()
+    data_cleaner.save_state()
+    feature_engineer.save_state()
+    pipeline_path = InferencePipeline(data_cleaner, feature_engineer, feature_selector, model_trainer.predictor,
+                                      input_columns=X.columns, input_dtypes=X.dtypes).save()
+    print(f"Inference pipeline saved to: {pipeline_path}")
     
     print("Generating visualizations...")
     if feature_importance:
@@ -0,0 +1,186 @@
+import numpy as np
+import json
+
+OBJECTIVES = ['binary:logistic', 'reg:logistic', 'multi:softprob', 'multi:softmax',
+              'reg:squarederror', 'reg:linear']
+
+def _parse_vector(value):
+    return np.array([float(v) for v in str(value).strip('[]').split(',')], dtype=np.float64)
+
+class TreeEnsemble:
+    def __init__(self):
+        self.feature = None
+        self.threshold = None
+        self.left = None
+        self.right = None
+        self.default_left = None
+        self.value = None
+        self.roots = None
+        self.tree_class = None
+        self.base_margin = None
+        self.objective = None
+        self.num_class = 1
+        self.trees_per_iteration = 1
+        self.max_depth = 0
+        self.consecutive_children = False
+        self.feature_names = None
+    
+    def from_booster(self, booster):
+        return self.from_model_json(json.loads(booster.save_raw(raw_format='json')))
+    
+    def from_model_json(self, model):
+        learner = model['learner']
+        booster = learner['gradient_booster']
+        if booster['name'] != 'gbtree':
+            raise ValueError(f"Unsupported booster: {booster['name']}")
+        
+        self.objective = learner['objective']['name']
+        if self.objective not in OBJECTIVES:
+            raise ValueError(f"Unsupported objective: {self.objective}")
+        
+        params = learner['learner_model_param']
+        self.num_class = max(int(params['num_class']), 1)
+        self.trees_per_iteration = self.num_class * int(booster['model']['gbtree_model_param']['num_parallel_tree'])
+        self.feature_names = learner.get('feature_names') or None
+        
+        base_score = _parse_vector(params['base_score'])
+        if self.objective in ['binary:logistic', 'reg:logistic']:
+            base_score = np.log(base_score / (1 - base_score))
+        self.base_margin = np.broadcast_to(base_score, self.num_class).astype(np.float64)
+        
+        trees = booster['model']['trees']
+        if any(any(tree.get('split_type', [])) for tree in trees):
+            raise ValueError("Categorical splits are not supported")
+        
+        sizes = [len(tree['left_children']) for tree in trees]
+        offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int32)
+        total = int(sum(sizes))
+        
+        self.feature = np.empty(total, dtype=np.int32)
+        self.threshold = np.empty(total, dtype=np.float32)
+        self.left = np.empty(total, dtype=np.int32)
+        self.right = np.empty(total, dtype=np.int32)
+        self.default_left = np.empty(total, dtype=bool)
+        self.value = np.zeros(total, dtype=np.float32)
+        self.max_depth = 0
+        
+        for tree, offset, size in zip(trees, offsets, sizes):
+            nodes = slice(offset, offset + size)
+            left = np.asarray(tree['left_children'], dtype=np.int32)
+            right = np.asarray(tree['right_children'], dtype=np.int32)
+            conditions = np.asarray(tree['split_conditions'], dtype=np.float32)
+            is_leaf = left == -1
+            own = np.arange(offset, offset + size, dtype=np.int32)
+            
+            self.feature[nodes] = np.where(is_leaf, 0, tree['split_indices'])
+            self.threshold[nodes] = np.where(is_leaf, np.inf, conditions)
+            self.left[nodes] = np.where(is_leaf, own, left + offset)
+            self.right[nodes] = np.where(is_leaf, own, right + offset)
+            self.default_left[nodes] = np.asarray(tree['default_left'], dtype=bool) | is_leaf
+            self.value[nodes] = np.where(is_leaf, conditions, 0)
+            self.max_depth = max(self.max_depth, self._tree_depth(left, right))
+        
+        self.roots = offsets
+        self.tree_class = np.asarray(booster['model']['tree_info'], dtype=np.int32)
+        self.consecutive_children = self._has_consecutive_children()
+        return self
+    
+    def _has_consecutive_children(self):
+        internal = self.left != self.right
+        return bool(np.all(self.right[internal] == self.left[internal] + 1))
+    
+    def _tree_depth(self, left, right):
+        depth = 0
+        level = np.array([0])
+        while True:
+            level = level[left[level] != -1]
+            if len(level) == 0:
+                return depth
+            level = np.concatenate([left[level], right[level]])
+            depth += 1
+    
+    def num_iterations(self):
+        return len(self.roots) // self.trees_per_iteration
+    
+    def _prepare_input(self, X):
+        if hasattr(X, 'columns'):
+            if self.feature_names and list(X.columns) != self.feature_names:
+                X = X[self.feature_names]
+            X = X.to_numpy(dtype=np.float32)
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        return X
+    
+    def predict_margin(self, X, iteration_range=None, block_size=1024):
+        if self.roots is None:
+            raise ValueError("TreeEnsemble not compiled")
+        
+        X = self._prepare_input(X)
+        start, end = iteration_range or (0, 0)
+        end = end or self.num_iterations()
+        trees = slice(start * self.trees_per_iteration, end * self.trees_per_iteration)
+        roots = self.roots[trees]
+        class_matrix = np.zeros((len(roots), self.num_class), dtype=np.float32)
+        class_matrix[np.arange(len(roots)), self.tree_class[trees]] = 1
+        
+        margin = np.empty((len(X), self.num_class), dtype=np.float64)
+        for row_start in range(0, len(X), block_size):
+            block = X[row_start:row_start + block_size]
+            flat = block.ravel()
+            row_offsets = (np.arange(len(block), dtype=np.int32) * X.shape[1])[:, None]
+            has_missing = np.isnan(block).any()
+            nodes = np.broadcast_to(roots, (len(block), len(roots)))
+            for _ in range(self.max_depth):
+                values = flat[row_offsets + np.take(self.feature, nodes)]
+                go_right = ~(values < np.take(self.threshold, nodes))
+                if has_missing:
+                    go_right &= ~(np.isnan(values) & np.take(self.default_left, nodes))
+                if self.consecutive_children:
+                    children = np.take(self.left, nodes)
+                    nodes = children + (go_right & (children != nodes))
+                else:
+                    nodes = np.where(go_right, np.take(self.right, nodes), np.take(self.left, nodes))
+            margin[row_start:row_start + len(block)] = np.take(self.value, nodes) @ class_matrix
+        
+        margin += self.base_margin
+        return margin[:, 0] if self.num_class == 1 else margin
+    
+    def predict(self, X, iteration_range=None, block_size=1024):
+        margin = self.predict_margin(X, iteration_range, block_size)
+        if self.objective in ['binary:logistic', 'reg:logistic']:
+            return 1 / (1 + np.exp(-margin))
+        if self.objective == 'multi:softprob':
+            exp = np.exp(margin - margin.max(axis=1, keepdims=True))
+            return exp / exp.sum(axis=1, keepdims=True)
+        if self.objective == 'multi:softmax':
+            return np.argmax(margin, axis=1)
+        return margin
+    
+    def save(self, path):
+        np.savez(path, feature=self.feature, threshold=self.threshold, left=self.left, right=self.right,
+                 default_left=self.default_left, value=self.value, roots=self.roots,
+                 tree_class=self.tree_class, base_margin=self.base_margin,
+                 meta=np.array(json.dumps({
+                     'objective': self.objective,
+                     'num_class': self.num_class,
+                     'trees_per_iteration': self.trees_per_iteration,
+                     'max_depth': self.max_depth,
+                     'feature_names': self.feature_names
+                 })))
+        return path
+    
+    def load(self, path):
+        arrays = np.load(path)
+        for name in ['feature', 'threshold', 'left', 'right', 'default_left', 'value', 'roots',
+                     'tree_class', 'base_margin']:
+            setattr(self, name, arrays[name])
+        
+        meta = json.loads(str(arrays['meta']))
+        self.objective = meta['objective']
+        self.num_class = meta['num_class']
+        self.trees_per_iteration = meta['trees_per_iteration']
+        self.max_depth = meta['max_depth']
+        self.feature_names = meta['feature_names']
+        self.consecutive_children = self._has_consecutive_children()
+        return self
\ No newline at end of file
@@ -1,86 +1,471 @@
 import xgboost as xgb
 import numpy as np
+from sklearn.metrics import roc_auc_score
 import joblib
-from config.model_config import XGBOOST_PARAMS, XGBOOST_SEVERITY_PARAMS
-from config.settings import RISK_THRESHOLD, MODELS_DIR
+import tempfile
+import mmap
+import json
+import time
+from src.modeling.tree_compiler import TreeEnsemble
+from config.model_config import XGBOOST_PARAMS, XGBOOST_SEVERITY_PARAMS, EARLY_STOPPING_PARAMS
+from config.settings import RISK_THRESHOLD, MODELS_DIR, MODEL_FORMAT
 import os
 
+MODEL_EXTENSIONS = {'ubj': '.ubj', 'json': '.json', 'pickle': '.pkl'}
+
+def native_params(params):
+    params = dict(params)
+    num_boost_round = params.pop('n_estimators', 100)
+    params['seed'] = params.pop('random_state', 0)
+    return params, num_boost_round
+
+class ChunkDataIter(xgb.DataIter):
+    def __init__(self, chunk_source, cache_prefix=None):
+        self.chunk_source = chunk_source
+        self.chunks = None
+        super().__init__(cache_prefix=cache_prefix)
+    
+    def next(self, input_data):
+        if self.chunks is None:
+            self.chunks = iter(self.chunk_source())
+        try:
+            X, y = next(self.chunks)
+        except StopIteration:
+            return 0
+        input_data(data=X, label=y)
+        return 1
+    
+    def reset(self):
+        self.chunks = None
+
 class XGBoostPredictor:
     def __init__(self):
         self.risk_model = None
         self.severity_model = None
         self.feature_names = None
         self.is_trained = False
+        self.nthread = None
+        self.load_report = {}
+        self.truncation_report = []
+    
+    @property
+    def risk_model(self):
+        if self._risk_model is None and self.risk_booster is not None:
+            self._risk_model = self._attach_wrapper(self.risk_booster)
+        return self._risk_model
+    
+    @risk_model.setter
+    def risk_model(self, model):
+        self._risk_model = model
+        self.risk_booster = model.get_booster() if model is not None else None
+    
+    @property
+    def severity_model(self):
+        if self._severity_model is None and self.severity_booster is not None:
+            self._severity_model = self._attach_wrapper(self.severity_booster)
+        return self._severity_model
+    
+    @severity_model.setter
+    def severity_model(self, model):
+        self._severity_model = model
+        self.severity_booster = model.get_booster() if model is not None else None
         
-    def train_risk_model(self, X_train, y_train, X_val=None, y_val=None):
-        self.risk_model = xgb.XGBClassifier(**XGBOOST_PARAMS)
+    def _fit_model(self, params, X_train, y_train, X_val=None, y_val=None, early_stopping=False):
+        has_validation = X_val is not None and y_val is not None
         
-        if X_val is not None and y_val is not None:
+        if early_stopping and has_validation:
+            model = xgb.XGBClassifier(**{**params, **EARLY_STOPPING_PARAMS})
+            model.fit(X_train, y_train, eval_set=[(X_val, y_val)], verbose=False)
+            model.set_params(early_stopping_rounds=None)
+        elif has_validation:
+            model = xgb.XGBClassifier(**params)
             eval_set = [(X_train, y_train), (X_val, y_val)]
-            self.risk_model.fit(X_train, y_train, eval_set=eval_set, verbose=False)
+            model.fit(X_train, y_train, eval_set=eval_set, verbose=False)
         else:
-            self.risk_model.fit(X_train, y_train)
+            model = xgb.XGBClassifier(**params)
+            model.fit(X_train, y_train)
+        return model
             
+    def train_risk_model(self, X_train, y_train, X_val=None, y_val=None, early_stopping=False):
+        self.risk_model = self._fit_model(XGBOOST_PARAMS, X_train, y_train, X_val, y_val, early_stopping)
         self.feature_names = X_train.columns.tolist() if hasattr(X_train, 'columns') else None
         self.is_trained = True
         
-    def train_severity_model(self, X_train, y_train, X_val=None, y_val=None):
-        self.severity_model = xgb.XGBClassifier(**XGBOOST_SEVERITY_PARAMS)
+    def train_severity_model(self, X_train, y_train, X_val=None, y_val=None, early_stopping=False):
+        self.severity_model = self._fit_model(XGBOOST_SEVERITY_PARAMS, X_train, y_train, X_val, y_val,
+                                              early_stopping)
+    
+    def _train_external(self, params, train_source, validation_source=None, cache_dir=None, max_bin=256,
+                        early_stopping=True):
+        params, num_boost_round = native_params({**params, 'tree_method': 'hist', 'max_bin': max_bin})
         
-        if X_val is not None and y_val is not None:
-            eval_set = [(X_train, y_train), (X_val, y_val)]
-            self.severity_model.fit(X_train, y_train, eval_set=eval_set, verbose=False)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            dtrain = xgb.DMatrix(ChunkDataIter(train_source, os.path.join(cache_dir, 'xgb_train')))
         else:
-            self.severity_model.fit(X_train, y_train)
+            dtrain = xgb.QuantileDMatrix(ChunkDataIter(train_source), max_bin=max_bin)
+        
+        evals = []
+        if validation_source is not None:
+            if cache_dir:
+                dval = xgb.DMatrix(ChunkDataIter(validation_source, os.path.join(cache_dir, 'xgb_validation')))
+            else:
+                dval = xgb.QuantileDMatrix(ChunkDataIter(validation_source), ref=dtrain, max_bin=max_bin)
+            evals = [(dval, 'validation')]
+        
+        booster = xgb.train(params, dtrain, num_boost_round, evals=evals, verbose_eval=False,
+                            early_stopping_rounds=EARLY_STOPPING_PARAMS['early_stopping_rounds']
+                            if early_stopping and evals else None)
+        
+        n_classes = params.get('num_class', 2)
+        booster.set_attr(scikit_learn=json.dumps({
+            '_estimator_type': 'classifier',
+            'n_classes_': n_classes,
+            'classes_': list(range(n_classes))
+        }))
+        return booster
+    
+    def train_risk_model_external(self, train_source, validation_source=None, cache_dir=None, max_bin=256,
+                                  early_stopping=True):
+        booster = self._train_external(XGBOOST_PARAMS, train_source, validation_source, cache_dir, max_bin,
+                                       early_stopping)
+        self.risk_model = None
+        self.risk_booster = booster
+        self.feature_names = booster.feature_names
+        self.is_trained = True
+    
+    def train_severity_model_external(self, train_source, validation_source=None, cache_dir=None, max_bin=256,
+                                      early_stopping=True):
+        booster = self._train_external(XGBOOST_SEVERITY_PARAMS, train_source, validation_source, cache_dir,
+                                       max_bin, early_stopping)
+        self.severity_model = None
+        self.severity_booster = booster
+        
+    def get_best_iteration(self, model_type='risk'):
+        booster = self.risk_booster if model_type == 'risk' else self.severity_booster
+        if booster is None or booster.attr('best_iteration') is None:
+            return None
+        return int(booster.attr('best_iteration'))
+        
+    def _iteration_range(self, booster):
+        best_iteration = booster.attr('best_iteration')
+        return (0, int(best_iteration) + 1) if best_iteration is not None else (0, 0)
+    
+    def set_nthread(self, nthread):
+        if nthread != self.nthread:
+            for booster in [self.risk_booster, self.severity_booster]:
+                if booster is not None:
+                    booster.set_param({'nthread': nthread})
+            self.nthread = nthread
+        return self
             
+    def _prepare_input(self, X):
+        if isinstance(X, dict):
+            X = [[X.get(name, np.nan) for name in self.feature_names]]
+        elif hasattr(X, 'columns'):
+            if self.feature_names and list(X.columns) != self.feature_names:
+                X = X[self.feature_names]
+            X = X.to_numpy(dtype=np.float32)
+        
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if self.feature_names and X.shape[1] != len(self.feature_names):
+            raise ValueError(f"Expected {len(self.feature_names)} features, got {X.shape[1]}")
+        return X
+    
     def predict_risk_probability(self, X):
-        if self.risk_model is None:
+        if self.risk_booster is None:
             raise ValueError("Risk model not trained")
-        return self.risk_model.predict_proba(X)[:, 1]
+        return self.risk_booster.inplace_predict(self._prepare_input(X), validate_features=False,
+                                                 iteration_range=self._iteration_range(self.risk_booster))
     
     def predict_risk(self, X, threshold=RISK_THRESHOLD):
         probabilities = self.predict_risk_probability(X)
         return (probabilities >= threshold).astype(int)
     
     def predict_severity(self, X):
-        if self.severity_model is None:
-            raise ValueError("Severity model not trained")
-        return self.severity_model.predict(X)
+        return np.argmax(self.predict_severity_probability(X), axis=1)
     
     def predict_severity_probability(self, X):
-        if self.severity_model is None:
+        if self.severity_booster is None:
             raise ValueError("Severity model not trained")
-        return self.severity_model.predict_proba(X)
+        return self.severity_booster.inplace_predict(self._prepare_input(X), validate_features=False,
+                                                     iteration_range=self._iteration_range(self.severity_booster))
+    
+    def score(self, X, threshold=RISK_THRESHOLD, risk=True, severity=True):
+        X = self._prepare_input(X)
+        scores = {}
+        
+        if risk:
+            if self.risk_booster is None:
+                raise ValueError("Risk model not trained")
+            scores['risk_probability'] = self.risk_booster.inplace_predict(
+                X, validate_features=False, iteration_range=self._iteration_range(self.risk_booster))
+            scores['risk'] = (scores['risk_probability'] >= threshold).astype(int)
+        
+        if severity and self.severity_booster is not None:
+            scores['severity_probability'] = self.severity_booster.inplace_predict(
+                X, validate_features=False, iteration_range=self._iteration_range(self.severity_booster))
+            scores['severity'] = np.argmax(scores['severity_probability'], axis=1)
+        
+        return scores
     
     def get_feature_importance(self, model_type='risk'):
-        model = self.risk_model if model_type == 'risk' else self.severity_model
-        if model is None:
+        booster = self.risk_booster if model_type == 'risk' else self.severity_booster
+        if booster is None:
             return None
             
-        importance = model.feature_importances_
+        scores = booster.get_score(importance_type='gain')
+        names = booster.feature_names or [f'f{i}' for i in range(booster.num_features())]
+        importance = np.array([scores.get(name, 0.0) for name in names], dtype=np.float32)
+        if importance.sum() > 0:
+            importance = importance / importance.sum()
         if self.feature_names:
             return dict(zip(self.feature_names, importance))
         return importance
     
-    def save_models(self, risk_path=None, severity_path=None):
+    def _attach_wrapper(self, booster):
+        model = xgb.XGBClassifier()
+        model.load_model(bytearray(booster.save_raw(raw_format='ubj')))
+        return model
+    
+    def _native_bytes(self, model_type, raw_format='ubj'):
+        model = self._risk_model if model_type == 'risk' else self._severity_model
+        booster = self.risk_booster if model_type == 'risk' else self.severity_booster
+        if model is None:
+            return booster.save_raw(raw_format=raw_format)
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'model' + MODEL_EXTENSIONS[raw_format])
+            model.save_model(path)
+            with open(path, 'rb') as f:
+                return f.read()
+    
+    def _read_booster(self, path, mmap_mode=False):
+        if not mmap_mode:
+            return xgb.Booster(model_file=path)
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            return xgb.Booster(model_file=bytearray(buffer))
+    
+    def _default_path(self, model_type, model_format):
+        return os.path.join(MODELS_DIR, f'xgboost_{model_type}_model{MODEL_EXTENSIONS[model_format]}')
+    
+    def _find_model_path(self, model_type):
+        for model_format in ['ubj', 'json', 'pickle']:
+            path = self._default_path(model_type, model_format)
+            if os.path.exists(path):
+                return path
+        return None
+    
+    def _save_model(self, model_type, path, model_format):
+        if model_format == 'pickle':
+            joblib.dump(self.risk_model if model_type == 'risk' else self.severity_model, path)
+        elif model_format in ['ubj', 'json']:
+            with open(path, 'wb') as f:
+                f.write(self._native_bytes(model_type, model_format))
+        else:
+            raise ValueError(f"Unknown model format: {model_format}")
+    
+    def _load_model(self, model_type, path, mmap_mode=False):
+        start = time.perf_counter()
+        model_format = 'pickle' if path.endswith(MODEL_EXTENSIONS['pickle']) else 'native'
+        if model_format == 'pickle':
+            model = joblib.load(path)
+            booster = model.get_booster()
+        else:
+            model = None
+            booster = self._read_booster(path, mmap_mode)
+        if self.nthread:
+            booster.set_param({'nthread': self.nthread})
+        
+        if model_type == 'risk':
+            self.risk_model = model
+            self.risk_booster = booster
+        else:
+            self.severity_model = model
+            self.severity_booster = booster
+        self.load_report[model_type] = {
+            'path': path,
+            'format': model_format,
+            'mmap': mmap_mode and model_format == 'native',
+            'file_bytes': os.path.getsize(path),
+            'load_seconds': time.perf_counter() - start
+        }
+        return booster
+    
+    def get_state(self, raw_format='ubj'):
+        return {
+            'format': raw_format,
+            'risk_model': self._native_bytes('risk', raw_format) if self.risk_booster is not None else None,
+            'severity_model': self._native_bytes('severity', raw_format) if self.severity_booster is not None else None,
+            'feature_names': self.feature_names
+        }
+    
+    def set_state(self, state):
+        self.risk_model = None
+        self.severity_model = None
+        if state['risk_model'] is not None:
+            self.risk_booster = xgb.Booster(model_file=bytearray(state['risk_model']))
+        if state['severity_model'] is not None:
+            self.severity_booster = xgb.Booster(model_file=bytearray(state['severity_model']))
+        self.feature_names = state['feature_names']
+        self.is_trained = self.risk_booster is not None
+        nthread, self.nthread = self.nthread, None
+        return self.set_nthread(nthread)
+    
+    def save_models(self, risk_path=None, severity_path=None, model_format=MODEL_FORMAT):
         if risk_path is None:
-            risk_path = os.path.join(MODELS_DIR, 'xgboost_risk_model.pkl')
+            risk_path = self._default_path('risk', model_format)
         if severity_path is None:
-            severity_path = os.path.join(MODELS_DIR, 'xgboost_severity_model.pkl')
+            severity_path = self._default_path('severity', model_format)
             
-        if self.risk_model:
-            joblib.dump(self.risk_model, risk_path)
-        if self.severity_model:
-            joblib.dump(self.severity_model, severity_path)
+        if self.risk_booster is not None:
+            self._save_model('risk', risk_path, model_format)
+        if self.severity_booster is not None:
+            self._save_model('severity', severity_path, model_format)
             
-    def load_models(self, risk_path=None, severity_path=None):
+    def load_models(self, risk_path=None, severity_path=None, mmap_mode=False):
         if risk_path is None:
-            risk_path = os.path.join(MODELS_DIR, 'xgboost_risk_model.pkl')
+            risk_path = self._find_model_path('risk')
         if severity_path is None:
-            severity_path = os.path.join(MODELS_DIR, 'xgboost_severity_model.pkl')
+            severity_path = self._find_model_path('severity')
             
-        if os.path.exists(risk_path):
-            self.risk_model = joblib.load(risk_path)
+        if risk_path and os.path.exists(risk_path):
+            booster = self._load_model('risk', risk_path, mmap_mode)
+            self.feature_names = booster.feature_names
             self.is_trained = True
-        if os.path.exists(severity_path):
-            self.severity_model = joblib.load(severity_path)
\ No newline at end of file
+        if severity_path and os.path.exists(severity_path):
+            self._load_model('severity', severity_path, mmap_mode)
+    
+    def compile_models(self):
+        compiled = {}
+        for model_type, booster in [('risk', self.risk_booster), ('severity', self.severity_booster)]:
+            if booster is not None:
+                start, end = self._iteration_range(booster)
+                compiled[model_type] = TreeEnsemble().from_booster(booster[start:end] if end else booster)
+        return compiled
+    
+    def check_compiled_models(self, X, compiled=None, tolerance=1e-5):
+        X = self._prepare_input(X)
+        signs = np.where(np.arange(X.shape[1]) % 2 == 0, np.inf, -np.inf).astype(np.float32)
+        X = np.vstack([X, np.full((1, X.shape[1]), np.inf, dtype=np.float32),
+                       np.full((1, X.shape[1]), -np.inf, dtype=np.float32), signs, -signs])
+        compiled = compiled or self.compile_models()
+        
+        report = {}
+        for model_type, ensemble in compiled.items():
+            booster = self.risk_booster if model_type == 'risk' else self.severity_booster
+            expected = booster.inplace_predict(X, validate_features=False,
+                                               iteration_range=self._iteration_range(booster))
+            report[model_type] = float(np.abs(ensemble.predict(X) - expected).max())
+            if report[model_type] > tolerance:
+                raise ValueError(f"Compiled {model_type} model differs from the booster by {report[model_type]}")
+        return report
+    
+    def evaluate_truncation(self, X_val, y_val, step=1, latency_rows=1, latency_repeats=20):
+        if self.risk_booster is None:
+            raise ValueError("Risk model not trained")
+        ensemble = TreeEnsemble().from_booster(self.risk_booster)
+        if ensemble.num_class > 1 or ensemble.trees_per_iteration > 1:
+            raise ValueError("Truncation analysis supports single-tree binary iterations only")
+        
+        X_val = self._prepare_input(X_val)
+        leaves = self.risk_booster.predict(xgb.DMatrix(X_val, feature_names=self.feature_names),
+                                           pred_leaf=True).reshape(len(X_val), -1)
+        margins = np.cumsum(ensemble.value[ensemble.roots + leaves.astype(np.int32)], axis=1, dtype=np.float64)
+        probabilities = 1 / (1 + np.exp(-(margins + ensemble.base_margin[0])))
+        
+        n_iterations = ensemble.num_iterations()
+        prefixes = list(range(step, n_iterations + 1, step))
+        if not prefixes or prefixes[-1] != n_iterations:
+            prefixes.append(n_iterations)
+        
+        sample = X_val[:latency_rows]
+        self.risk_booster.inplace_predict(sample, validate_features=False)
+        best_iteration = self.get_best_iteration('risk')
+        self.truncation_report = []
+        for n_trees in prefixes:
+            start = time.perf_counter()
+            for _ in range(latency_repeats):
+                self.risk_booster.inplace_predict(sample, validate_features=False, iteration_range=(0, n_trees))
+            
+            self.truncation_report.append({
+                'n_trees': n_trees,
+                'auc': roc_auc_score(y_val, probabilities[:, n_trees - 1]),
+                'latency_ms': (time.perf_counter() - start) / latency_repeats * 1000,
+                'model_bytes': len(self.risk_booster[:n_trees].save_raw(raw_format='ubj')),
+                'is_best_iteration': best_iteration is not None and n_trees == best_iteration + 1
+            })
+        return self.truncation_report
+    
+    def select_truncation(self, max_auc_drop=0.005, report=None):
+        report = report or self.truncation_report
+        if not report:
+            raise ValueError("Run evaluate_truncation first")
+        
+        best_auc = max(entry['auc'] for entry in report)
+        return next(entry for entry in report if entry['auc'] >= best_auc - max_auc_drop)
+    
+    def truncate_risk_model(self, n_trees, path=None, model_format=MODEL_FORMAT):
+        if self.risk_booster is None:
+            raise ValueError("Risk model not trained")
+        
+        booster = self.risk_booster[:n_trees]
+        booster.feature_names = self.risk_booster.feature_names
+        booster.feature_types = self.risk_booster.feature_types
+        attributes = self.risk_booster.attributes()
+        if 'best_iteration' in attributes and int(attributes['best_iteration']) >= n_trees:
+            attributes.pop('best_iteration')
+            attributes.pop('best_score', None)
+        booster.set_attr(**attributes)
+        if self.nthread:
+            booster.set_param({'nthread': self.nthread})
+        
+        if path is None:
+            return booster
+        if model_format == 'pickle':
+            joblib.dump(self._attach_wrapper(booster), path)
+        elif model_format in ['ubj', 'json']:
+            with open(path, 'wb') as f:
+                f.write(booster.save_raw(raw_format=model_format))
+        else:
+            raise ValueError(f"Unknown model format: {model_format}")
+        return booster
+    
+    def save_compiled_models(self, directory=None):
+        directory = directory or MODELS_DIR
+        return {
+            model_type: ensemble.save(os.path.join(directory, f'compiled_{model_type}_model.npz'))
+            for model_type, ensemble in self.compile_models().items()
+        }
+    
+    def benchmark_model_formats(self, formats=('pickle', 'json', 'ubj'), repeats=5, directory=None):
+        if self.risk_booster is None:
+            raise ValueError("Risk model not trained")
+        
+        results = {}
+        with tempfile.TemporaryDirectory(dir=directory) as tmp_dir:
+            for model_format in formats:
+                path = os.path.join(tmp_dir, 'xgboost_risk_model' + MODEL_EXTENSIONS[model_format])
+                self._save_model('risk', path, model_format)
+                
+                variants = [False, True] if model_format != 'pickle' else [False]
+                for mmap_mode in variants:
+                    predictor = XGBoostPredictor()
+                    timings = []
+                    for _ in range(repeats):
+                        predictor._load_model('risk', path, mmap_mode)
+                        timings.append(predictor.load_report['risk']['load_seconds'])
+                    
+                    results[model_format + ('+mmap' if mmap_mode else '')] = {
+                        'file_bytes': os.path.getsize(path),
+                        'load_seconds': float(np.median(timings))
+                    }
+        
+        baseline = results.get('pickle')
+        if baseline:
+            for entry in results.values():
+                entry['size_ratio'] = entry['file_bytes'] / baseline['file_bytes']
+                entry['speedup'] = baseline['load_seconds'] / entry['load_seconds']
+        return results
\ No newline at end of file